@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Sync vs async view throughput benchmark.
+
+Drives the DRF views and their ASGI variants side by side with the same
+concurrent load, and reports p50/p95/p99 latency and requests per second
+for each. The sync views should run under the production WSGI setup
+(e.g. gunicorn with sync workers) and the async ones under uvicorn, both
+pointed at the local SMTP stand-in this script starts; --smtp-latency
+makes every delivery as slow as a real relay, which is where the sync
+workers block.
+
+Scenarios:
+
+    email      GET the email test endpoints with ?send=true (SMTP-bound)
+    register   POST multipart registrations (database-bound; the mail is
+               queued, not sent in the request)
+
+Backend settings for both servers, e.g.:
+
+    EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    EMAIL_HOST, EMAIL_PORT, EMAIL_USE_TLS = 'localhost', 1027, False
+    RATE_LIMITS = {'email_test': {'ip': (100000, 3600)},
+                   'register': {'ip': (100000, 3600), 'identity': (100000, 3600)}}
+
+    gunicorn somase.wsgi -w 4 -b :8000 &  uvicorn somase.asgi:application --workers 4 --port 8001 &
+    python bench/async_views.py --scenario email --requests 400 --concurrency 50 \\
+        --sync-url http://localhost:8000 --sync-path /api/test-email/ \\
+        --async-url http://localhost:8001 --async-path /api/test-email-async/
+"""
+
+import argparse
+import time
+import uuid
+
+from common import Client, Recorder, run_concurrently, start_smtp_server, write_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scenario', choices=('email', 'register'), default='email')
+    parser.add_argument('--sync-url', default='http://localhost:8000')
+    parser.add_argument('--sync-path', required=True, help='route of the sync view, e.g. /api/test-email/')
+    parser.add_argument('--async-url', default='http://localhost:8001')
+    parser.add_argument('--async-path', required=True, help='route of its async variant')
+    parser.add_argument('--requests', type=int, default=200, help='requests per variant')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--smtp-host', default='localhost')
+    parser.add_argument('--smtp-port', type=int, default=1027)
+    parser.add_argument('--smtp-latency', type=float, default=0.2, help='seconds added to every delivery')
+    parser.add_argument('--output', help='where to write the JSON report')
+    parser.add_argument('--compare', help='previous JSON report to compare against')
+    args = parser.parse_args()
+
+    smtp = start_smtp_server(args.smtp_host, args.smtp_port, latency=args.smtp_latency)
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:6]
+
+    def step_for(label, client, path):
+        if args.scenario == 'email':
+            return lambda index: client.request(label, 'GET', f"{path}?send=true")
+
+        def register(index):
+            username = f"async{run_id}{label[0]}{index}"
+            password = f"Bench-{run_id}-pw!"
+            client.request(label, 'POST', path, multipart={
+                'username': username,
+                'email': f"{username}@bench.invalid",
+                'password': password,
+                'password2': password,
+            })
+        return register
+
+    started = time.time()
+    for label, base_url, path in (('sync', args.sync_url, args.sync_path), ('async', args.async_url, args.async_path)):
+        print(f"variant: {label} ({base_url}{path})")
+        client = Client(base_url, recorder)
+        run_concurrently(recorder, [label], args.concurrency, range(args.requests), step_for(label, client, path))
+    smtp_counts = smtp.stats.snapshot()
+    smtp.shutdown()
+
+    endpoints = recorder.summary()
+    endpoints.pop('csrf', None)
+    report = {
+        'started_at': started,
+        'duration_seconds': round(time.time() - started, 2),
+        'scenario': args.scenario,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'smtp_latency': args.smtp_latency,
+        'smtp': smtp_counts,
+        'endpoints': endpoints,
+    }
+    if endpoints.get('sync', {}).get('throughput_rps'):
+        report['async_speedup'] = round(endpoints['async']['throughput_rps'] / endpoints['sync']['throughput_rps'], 2)
+        print(f"async/sync throughput: {report['async_speedup']}x")
+    write_report(report, 'async_views', args.output, args.compare)
+
+
+if __name__ == '__main__':
+    main()
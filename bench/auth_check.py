@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Dashboard-mount benchmark for the auth fast path.
+
+Every dashboard mount calls /get-csrf/ and /api/auth/check/ before doing
+anything else. This logs in --sessions separate sessions and has each of
+them repeat that pair --mounts times at the given concurrency, reporting
+p50/p95/p99 latency per endpoint. The first check after login (snapshot
+cache miss) is reported separately as 'auth_check_cold'; it must answer
+200 for every session, otherwise the script exits non-zero.
+
+    python bench/auth_check.py --email voter@example.com --password secret \\
+        --sessions 20 --mounts 50 --output bench/results/auth_check.json
+
+Use --check-path to time another implementation of the check under the
+same load, and --compare to diff against an earlier report.
+"""
+
+import argparse
+import sys
+import time
+
+from common import Client, Recorder, run_concurrently, write_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--email', required=True, help='an active account to log in as')
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--mounts', type=int, default=50, help='dashboard mounts per session')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--check-path', default='/api/auth/check/')
+    parser.add_argument('--output', help='where to write the JSON report')
+    parser.add_argument('--compare', help='previous JSON report to compare against')
+    args = parser.parse_args()
+
+    recorder = Recorder()
+    clients = [Client(args.base_url, recorder) for _ in range(args.sessions)]
+    cold_failures = []
+
+    def log_in(client):
+        status, _ = client.login(args.email, args.password)
+        if status != 200:
+            cold_failures.append(f"login: {status}")
+            return
+        # Straight after login the snapshot cache is always cold
+        status, _ = client.request('auth_check_cold', 'GET', args.check_path)
+        if status != 200:
+            cold_failures.append(f"auth check after login: {status}")
+
+    def mount(client):
+        for _ in range(args.mounts):
+            client.request('get_csrf', 'GET', '/get-csrf/')
+            client.request('auth_check', 'GET', args.check_path)
+
+    started = time.time()
+    run_concurrently(recorder, ['csrf', 'login', 'auth_check_cold'], args.concurrency, clients, log_in)
+    run_concurrently(recorder, ['get_csrf', 'auth_check'], args.concurrency, clients, mount)
+
+    report = {
+        'started_at': started,
+        'duration_seconds': round(time.time() - started, 2),
+        'base_url': args.base_url,
+        'check_path': args.check_path,
+        'sessions': args.sessions,
+        'mounts': args.mounts,
+        'concurrency': args.concurrency,
+        'endpoints': recorder.summary(),
+    }
+    write_report(report, 'auth_check', args.output, args.compare)
+
+    if cold_failures:
+        print(f"FAIL: {len(cold_failures)} of {args.sessions} sessions: {', '.join(sorted(set(cold_failures)))}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
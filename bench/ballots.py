@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Ballot ingestion benchmark for /api/bulk-vote/.
+
+Creates --voters throwaway voters, then submits one full ballot for each
+straight through the bulk_vote view on --concurrency threads and reports
+ballots/second with p50/p95/p99 latency. Afterwards --race voters each
+submit the same ballot --parallel times at once: every round must end with
+exactly one 201 and only 409s besides, and the candidates' counters must
+have grown by exactly the votes stored. Exits non-zero otherwise. The bench
+voters (and their votes, off the tallies) are deleted at the end unless
+--keep is given.
+
+Runs in-process against the project's configured database, so it needs no
+server. Approve some candidates and start the election first; outside it
+every ballot is answered 403. SQLite works, but concurrent ballots only
+queue on its write lock with
+
+    DATABASES['default']['OPTIONS'] = {'transaction_mode': 'IMMEDIATE'}   # Django 5.1+
+
+otherwise they fail with "database is locked". For PostgreSQL a local
+server is enough. Run it from the Django project root:
+
+    DJANGO_SETTINGS_MODULE=somase.settings \\
+        python path/to/bench/ballots.py --views-module voting.views --voters 2000 --concurrency 16
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from common import Recorder, load_views, run_concurrently, write_report
+
+
+def create_voters(count, run_id):
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    voters = []
+    for index in range(count):
+        voter = User(username=f"ballot{run_id}{index}", email=f"ballot{run_id}{index}@bench.invalid", is_active=True)
+        voter.set_unusable_password()
+        voters.append(voter)
+    User.objects.bulk_create(voters, batch_size=500)
+    return list(User.objects.filter(username__startswith=f"ballot{run_id}").order_by('pk'))
+
+
+def make_ballot(by_position):
+    return {'votes': [
+        {'position': position, 'candidate_id': random.choice(ids)}
+        for position, ids in by_position.items()
+    ]}
+
+
+def submit(views, voter, ballot):
+    from django.db import connection
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    request = APIRequestFactory().post('/api/bulk-vote/', ballot, format='json')
+    force_authenticate(request, user=voter)
+    try:
+        return views.bulk_vote(request).status_code
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    finally:
+        # Worker threads outlive the run; don't leave their connections open
+        connection.close()
+
+
+def race(views, voters, ballots, parallel):
+    outcomes = []
+    for voter in voters:
+        barrier = threading.Barrier(parallel)
+
+        def attempt(_):
+            barrier.wait()
+            return submit(views, voter, ballots[voter.pk])
+
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            outcomes.append(Counter(executor.map(attempt, range(parallel))))
+    return outcomes
+
+
+def tally_total(views):
+    from django.db.models import Sum
+
+    Candidate = views._election_model('ELECTION_CANDIDATE_MODEL', 'elections.Candidate')
+    return Candidate._base_manager.aggregate(total=Sum('votes'))['total'] or 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--views-module', required=True, help='dotted path of the views module, e.g. voting.views')
+    parser.add_argument('--voters', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--race', type=int, default=20, help='voters whose ballot is submitted in parallel')
+    parser.add_argument('--parallel', type=int, default=8, help='simultaneous submissions per racing voter')
+    parser.add_argument('--keep', action='store_true', help='keep the bench voters and their votes')
+    parser.add_argument('--output', help='where to write the JSON report')
+    parser.add_argument('--compare', help='previous JSON report to compare against')
+    args = parser.parse_args()
+
+    views = load_views(args.views_module)
+    Vote = views._election_model('ELECTION_VOTE_MODEL', 'elections.Vote')
+
+    by_position = defaultdict(list)
+    for candidate_id, position in views.candidate_positions().items():
+        by_position[position].append(candidate_id)
+    if not by_position:
+        raise SystemExit('no approved candidates; approve some before running the benchmark')
+
+    run_id = uuid.uuid4().hex[:6]
+    voters = create_voters(args.voters + args.race, run_id)
+    ballots = {voter.pk: make_ballot(by_position) for voter in voters}
+    steady, racing = voters[:args.voters], voters[args.voters:]
+    tallies_before = tally_total(views)
+
+    recorder = Recorder()
+    statuses = Counter()
+    statuses_lock = threading.Lock()
+
+    def cast(voter):
+        started = time.perf_counter()
+        outcome = submit(views, voter, ballots[voter.pk])
+        recorder.record('bulk_vote', time.perf_counter() - started, outcome == 201)
+        with statuses_lock:
+            statuses[outcome] += 1
+
+    started = time.time()
+    try:
+        print(f"phase: {args.voters} ballots on {args.concurrency} threads")
+        run_concurrently(recorder, ['bulk_vote'], args.concurrency, steady, cast)
+        print(f"phase: {args.race} voters x {args.parallel} parallel submissions")
+        outcomes = race(views, racing, ballots, args.parallel)
+
+        stored = Vote._base_manager.filter(voter__in=voters).count()
+        tallies_added = tally_total(views) - tallies_before
+    finally:
+        if not args.keep:
+            for voter in voters:
+                views.delete_user(voter)
+
+    problems = [f"{dict(outcome)}" for outcome in outcomes if outcome[201] != 1 or outcome[409] != args.parallel - 1]
+    if tallies_added != stored:
+        problems.append(f"counters grew by {tallies_added} for {stored} stored votes")
+
+    report = {
+        'started_at': started,
+        'duration_seconds': round(time.time() - started, 2),
+        'voters': args.voters,
+        'concurrency': args.concurrency,
+        'positions': len(by_position),
+        'statuses': {str(outcome): count for outcome, count in statuses.items()},
+        'race': {'voters': args.race, 'parallel': args.parallel, 'failed_rounds': len(problems)},
+        'endpoints': recorder.summary(),
+    }
+    write_report(report, 'ballots', args.output, args.compare)
+    print(f"ballots/second: {report['endpoints']['bulk_vote']['throughput_rps']}  statuses: {dict(statuses)}")
+
+    if problems:
+        print('FAIL')
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print('race ok: one 201 per voter, tallies match the stored votes')
+
+
+if __name__ == '__main__':
+    main()
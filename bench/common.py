@@ -0,0 +1,349 @@
+"""
+Shared pieces of the benchmark scripts: a local SMTP stand-in, an HTTP
+client with its own session and CSRF token, latency recording and JSON
+reports that can be compared between runs. Standard library only, except
+load_views(), which needs the project's Django environment.
+"""
+
+import email
+import http.cookiejar
+import importlib
+import json
+import math
+import os
+import re
+import socketserver
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+
+ACTIVATION_LINK = re.compile(r'/activate/([\w-]+)/([\w-]+)')
+
+
+def load_views(module):
+    """
+    Import the project's views module (e.g. 'voting.views') in-process.
+    Django is configured from DJANGO_SETTINGS_MODULE; run from the project
+    root so the project package is importable.
+    """
+    import django
+
+    sys.path.insert(0, os.getcwd())
+    django.setup()
+    return importlib.import_module(module)
+
+
+# ---------------------------------------------------------------------------
+# SMTP stand-in
+#
+# Speaks enough ESMTP for smtplib and Django's SMTP backend (EHLO, AUTH
+# PLAIN/LOGIN with any credentials, NOOP, RSET). It counts connections,
+# logins and messages, and can add latency to every delivery to stand in
+# for a slow relay. TLS is not supported, so run the backend with
+# EMAIL_USE_TLS = False against it.
+# ---------------------------------------------------------------------------
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.stats.add('connections')
+        self.reply('220 bench ESMTP')
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+            if verb == 'EHLO':
+                self.reply('250-bench')
+                self.reply('250 AUTH PLAIN LOGIN')
+            elif verb == 'HELO':
+                self.reply('250 bench')
+            elif verb == 'AUTH':
+                # Any credentials are accepted
+                self.server.stats.add('logins')
+                mechanism = command.split()[1].upper() if len(command.split()) > 1 else ''
+                if mechanism == 'LOGIN':
+                    for prompt in ('VXNlcm5hbWU6', 'UGFzc3dvcmQ6'):
+                        self.reply(f'334 {prompt}')
+                        self.rfile.readline()
+                elif mechanism == 'PLAIN' and len(command.split()) == 2:
+                    self.reply('334 ')
+                    self.rfile.readline()
+                self.reply('235 Authentication successful')
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[1].strip().strip('<>').lower())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(data[1:] if data.startswith(b'..') else data)
+                if self.server.latency:
+                    time.sleep(self.server.latency)
+                self.server.mailbox.deliver(recipients, b''.join(lines))
+                self.server.stats.add('messages')
+                self.reply('250 OK')
+            elif verb in ('NOOP', 'RSET'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class Counters:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)
+
+    def add(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+class Mailbox:
+    """
+    Activation links captured by the SMTP stand-in, keyed by recipient
+    """
+
+    def __init__(self):
+        self._links = {}
+        self._condition = threading.Condition()
+
+    def deliver(self, recipients, raw):
+        message = email.message_from_bytes(raw)
+        body = ''
+        for part in message.walk():
+            if part.get_content_maintype() == 'text':
+                payload = part.get_payload(decode=True) or b''
+                body += payload.decode(part.get_content_charset() or 'utf-8', 'replace')
+        match = ACTIVATION_LINK.search(body)
+        if not match:
+            return
+        with self._condition:
+            for recipient in recipients:
+                self._links[recipient] = match.groups()
+            self._condition.notify_all()
+
+    def wait_for(self, address, timeout):
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while address.lower() not in self._links:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            return self._links[address.lower()]
+
+
+def start_smtp_server(host, port, latency=0.0):
+    server = socketserver.ThreadingTCPServer((host, port), _SMTPHandler)
+    server.daemon_threads = True
+    server.mailbox = Mailbox()
+    server.stats = Counters()
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+class Recorder:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.phase_seconds = {}
+
+    def record(self, endpoint, elapsed, ok):
+        with self._lock:
+            self.samples[endpoint].append(elapsed)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def record_failure(self, endpoint):
+        # Counted as an error without a latency sample
+        with self._lock:
+            self.samples.setdefault(endpoint, [])
+            self.errors[endpoint] += 1
+
+    @contextmanager
+    def timed(self, endpoint):
+        """
+        Record the duration of a block; an exception counts as an error
+        """
+        started = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(endpoint, time.perf_counter() - started, ok)
+
+    def summary(self):
+        report = {}
+        for endpoint, samples in self.samples.items():
+            ordered = sorted(samples) or [0.0]
+            wall = self.phase_seconds.get(endpoint) or sum(samples)
+            report[endpoint] = {
+                'requests': len(samples),
+                'errors': self.errors[endpoint],
+                'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+                'p95_ms': round(percentile(ordered, 95) * 1000, 2),
+                'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+                'max_ms': round(ordered[-1] * 1000, 2),
+                'throughput_rps': round(len(samples) / wall, 2) if wall else 0.0,
+            }
+        return report
+
+
+def percentile(ordered, pct):
+    # Nearest-rank percentile
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def run_concurrently(recorder, endpoints, concurrency, items, step):
+    """
+    Run step(item) for every item on `concurrency` threads; the wall time
+    is what throughput for `endpoints` is computed against
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(step, items))
+    elapsed = time.perf_counter() - started
+    for endpoint in endpoints:
+        recorder.phase_seconds[endpoint] = elapsed
+
+
+def compare(report, baseline):
+    lines = []
+    for endpoint, current in sorted(report['endpoints'].items()):
+        previous = baseline.get('endpoints', {}).get(endpoint)
+        if not previous:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'):
+            before, after = previous[metric], current[metric]
+            change = ((after - before) / before * 100) if before else 0.0
+            lines.append(f"  {endpoint:<16} {metric:<15} {before:>10} -> {after:<10} ({change:+.1f}%)")
+    return lines
+
+
+def write_report(report, name, output=None, compare_with=None):
+    """
+    Print the per-endpoint table, write `report` as JSON and optionally
+    diff it against an earlier report
+    """
+    print(f"{'endpoint':<16} {'requests':>8} {'errors':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>8}")
+    for endpoint, row in report['endpoints'].items():
+        print(f"{endpoint:<16} {row['requests']:>8} {row['errors']:>6} {row['p50_ms']:>9} "
+              f"{row['p95_ms']:>9} {row['p99_ms']:>9} {row['throughput_rps']:>8}")
+
+    output = output or f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"report written to {output}")
+
+    if compare_with:
+        with open(compare_with) as f:
+            baseline = json.load(f)
+        print(f"compared with {compare_with}:")
+        print('\n'.join(compare(report, baseline)) or '  no common endpoints')
+
+
+# ---------------------------------------------------------------------------
+# HTTP client
+# ---------------------------------------------------------------------------
+
+def encode_multipart(fields):
+    boundary = f"----bench{uuid.uuid4().hex}"
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+        )
+    parts.append(f"--{boundary}--\r\n")
+    return ''.join(parts).encode('utf-8'), f"multipart/form-data; boundary={boundary}"
+
+
+class Client:
+    """
+    One browser: its own cookie jar (session + CSRF cookie). Every request
+    is timed into `recorder` under the given endpoint name.
+    """
+
+    def __init__(self, base_url, recorder):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def _csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        status, body = self.request('csrf', 'GET', '/get-csrf/')
+        if isinstance(body, dict) and body.get('csrfToken'):
+            return body['csrfToken']
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def request(self, endpoint, method, path, json_body=None, multipart=None):
+        headers = {'Accept': 'application/json', 'Referer': self.base_url + '/'}
+        data = None
+        if method != 'GET' and endpoint != 'csrf':
+            headers['X-CSRFToken'] = self._csrf_token()
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif multipart is not None:
+            data, headers['Content-Type'] = encode_multipart(multipart)
+
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        started = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                status, raw = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, raw = e.code, e.read()
+        except OSError:
+            status, raw = 0, b''
+        self.recorder.record(endpoint, time.perf_counter() - started, 200 <= status < 400)
+
+        try:
+            return status, json.loads(raw or b'null')
+        except ValueError:
+            return status, None
+
+    def login(self, email_address, password):
+        # The rotated CSRF cookie from the login response replaces the old one
+        return self.request('login', 'POST', '/login/', json_body={'email': email_address, 'password': password})
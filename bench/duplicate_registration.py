@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Parallel duplicate-registration check.
+
+Fires --parallel registrations at once that share an email (with distinct
+usernames), then --parallel that share a username (with distinct emails).
+Each round must end with exactly one 201; every other attempt must be a
+400 carrying the matching "already exists"/"already taken" message, never a
+500. Exits non-zero otherwise.
+
+Lift the registration rate limit on the backend first, e.g.:
+
+    RATE_LIMITS = {'register': {'ip': (100000, 3600), 'identity': (100000, 3600)}}
+
+    python bench/duplicate_registration.py --parallel 20 --rounds 5
+"""
+
+import argparse
+import sys
+import threading
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from common import Client, Recorder
+
+
+def register_all(base_url, recorder, forms):
+    clients = [Client(base_url, recorder) for _ in forms]
+    # Fetch every CSRF token first so the POSTs leave together
+    for client in clients:
+        client._csrf_token()
+    barrier = threading.Barrier(len(forms))
+
+    def register(pair):
+        client, form = pair
+        barrier.wait()
+        return client.request('register', 'POST', '/register/', multipart=form)
+
+    with ThreadPoolExecutor(max_workers=len(forms)) as executor:
+        return list(executor.map(register, zip(clients, forms)))
+
+
+def check_round(label, results, expected_error):
+    outcomes = Counter(status for status, _ in results)
+    problems = []
+    if outcomes[201] != 1:
+        problems.append(f"{outcomes[201]} registrations succeeded")
+    for status, body in results:
+        if status == 201:
+            continue
+        error = body.get('error', '') if isinstance(body, dict) else ''
+        if status != 400 or error != expected_error:
+            problems.append(f"{status}: {error or body}")
+    verdict = 'ok' if not problems else 'FAIL'
+    print(f"{label:<16} {dict(outcomes)} {verdict}")
+    for problem in problems:
+        print(f"  {problem}")
+    return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--parallel', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    recorder = Recorder()
+    passed = True
+    for round_number in range(args.rounds):
+        run_id = uuid.uuid4().hex[:8]
+        password = f"Dup-{run_id}-pw!"
+
+        def form(username, email):
+            return {'username': username, 'email': email, 'password': password, 'password2': password}
+
+        same_email = [form(f"dup{run_id}u{i}", f"dup{run_id}@bench.invalid") for i in range(args.parallel)]
+        same_username = [form(f"dup{run_id}", f"dup{run_id}e{i}@bench.invalid") for i in range(args.parallel)]
+
+        passed &= check_round(
+            f"email #{round_number + 1}",
+            register_all(args.base_url, recorder, same_email),
+            'An account with this email already exists. Please use a different email.',
+        )
+        passed &= check_round(
+            f"username #{round_number + 1}",
+            register_all(args.base_url, recorder, same_username),
+            'Username already taken. Please choose a different username.',
+        )
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
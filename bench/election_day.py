@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Election-day load test.
+
+Drives a running backend through the same path voters take on election
+morning: register -> activate (via the emailed link) -> login -> list
+candidates -> bulk vote -> poll results, with N simulated voters at a
+configurable concurrency. Reports p50/p95/p99 latency and throughput per
+endpoint and writes them as JSON so runs can be compared.
+
+Only the standard library is used. A local SMTP stand-in is started by the
+script to capture activation emails, so point the backend at it, use a
+throwaway local database and lift the registration rate limit, e.g.:
+
+    EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    EMAIL_HOST, EMAIL_PORT, EMAIL_USE_TLS = 'localhost', 1025, False
+    EMAIL_HOST_USER, EMAIL_HOST_PASSWORD = '', ''   # or any credentials; AUTH always succeeds
+    RATE_LIMITS = {'register': {'ip': (100000, 3600), 'identity': (100000, 3600)}}
+
+    python manage.py runserver 8000   # or the ASGI/WSGI server used in production
+    python bench/election_day.py --voters 200 --concurrency 20 \\
+        --compare bench/results/previous.json
+
+Burst activation (every link clicked again 3 times at once right after the
+first click) is measured separately as 'activate_repeat':
+
+    python bench/election_day.py --voters 500 --concurrency 50 --activation-repeats 3
+
+The election must be started (and candidates registered) beforehand for the
+vote phase to succeed; failures are still timed and counted per endpoint.
+"""
+
+import argparse
+import random
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from common import Client, Recorder, run_concurrently, start_smtp_server, write_report
+
+
+# ---------------------------------------------------------------------------
+# Simulated voter
+# ---------------------------------------------------------------------------
+
+class Voter(Client):
+
+    def __init__(self, base_url, recorder, index, run_id):
+        super().__init__(base_url, recorder)
+        self.username = f"bench{run_id}{index}"
+        self.email = f"{self.username}@bench.invalid"
+        self.password = f"Bench-{run_id}-pw!"
+
+    def register(self):
+        # Multipart like the registration form; register_view reads
+        # anything else as JSON
+        self.request('register', 'POST', '/register/', multipart={
+            'username': self.username,
+            'email': self.email,
+            'password': self.password,
+            'password2': self.password,
+        })
+
+    def activate(self, mailbox, timeout, repeat_clicks=0):
+        link = mailbox.wait_for(self.email, timeout)
+        if link is None:
+            self.recorder.record_failure('activate')
+            return
+        path = "/activate/{}/{}/".format(*link)
+        self.request('activate', 'GET', path)
+        if repeat_clicks:
+            # Impatient users clicking the same link again, all at once
+            with ThreadPoolExecutor(max_workers=repeat_clicks) as executor:
+                for _ in range(repeat_clicks):
+                    executor.submit(self.request, 'activate_repeat', 'GET', path)
+
+    def login(self):
+        super().login(self.email, self.password)
+
+    def vote(self):
+        status, candidates = self.request('candidates', 'GET', '/api/candidates/')
+        if status != 200 or not isinstance(candidates, list):
+            return
+        by_position = defaultdict(list)
+        for candidate in candidates:
+            by_position[candidate.get('position')].append(candidate.get('id'))
+        votes = [
+            {'position': position, 'candidate_id': random.choice(ids)}
+            for position, ids in by_position.items() if position and ids
+        ]
+        self.request('bulk_vote', 'POST', '/api/bulk-vote/', json_body={'votes': votes})
+
+    def poll_results(self, polls, interval):
+        for _ in range(polls):
+            self.request('results', 'GET', '/api/results/')
+            time.sleep(interval)
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--voters', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--result-polls', type=int, default=5, help='results requests per voter')
+    parser.add_argument('--poll-interval', type=float, default=1.0)
+    parser.add_argument('--smtp-host', default='localhost')
+    parser.add_argument('--smtp-port', type=int, default=1025)
+    parser.add_argument('--activation-timeout', type=float, default=60.0,
+                        help='seconds to wait for each activation email')
+    parser.add_argument('--activation-repeats', type=int, default=0,
+                        help='extra concurrent clicks on each activation link (burst activation traffic)')
+    parser.add_argument('--output', help='where to write the JSON report')
+    parser.add_argument('--compare', help='previous JSON report to compare against')
+    args = parser.parse_args()
+
+    smtp = start_smtp_server(args.smtp_host, args.smtp_port)
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:6]
+    voters = [Voter(args.base_url, recorder, i, run_id) for i in range(args.voters)]
+
+    phases = [
+        (['csrf', 'register'], Voter.register),
+        (['activate', 'activate_repeat'],
+         lambda voter: voter.activate(smtp.mailbox, args.activation_timeout, args.activation_repeats)),
+        (['login'], Voter.login),
+        (['candidates', 'bulk_vote'], Voter.vote),
+        (['results'], lambda voter: voter.poll_results(args.result_polls, args.poll_interval)),
+    ]
+    started = time.time()
+    for endpoints, step in phases:
+        print(f"phase: {', '.join(endpoints)}")
+        run_concurrently(recorder, endpoints, args.concurrency, voters, step)
+    smtp.shutdown()
+
+    report = {
+        'started_at': started,
+        'duration_seconds': round(time.time() - started, 2),
+        'base_url': args.base_url,
+        'voters': args.voters,
+        'concurrency': args.concurrency,
+        'endpoints': recorder.summary(),
+    }
+
+    write_report(report, 'election_day', args.output, args.compare)
+
+
+if __name__ == '__main__':
+    main()
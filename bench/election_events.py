@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Request volume of dashboard polling vs the election event channel.
+
+Simulates --clients open dashboards for --duration seconds in two modes
+and counts the HTTP requests they make:
+
+    polling  every client polls each --poll PATH:SECONDS endpoint on its
+             own timer (default: the admin dashboard's results, unread
+             audit-log count and election-end checks)
+    events   every client holds one /api/events/ stream (or, with
+             --long-poll, loops on /api/events/poll/) and only reconnects
+             when dropped
+
+The event views need the API served under ASGI (uvicorn); under WSGI they
+answer 501 and the events mode reports only errors. All clients share one
+logged-in session:
+
+    python bench/election_events.py --email admin@example.com --password secret \\
+        --clients 1000 --duration 60
+"""
+
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from common import Client, Counters, Recorder
+
+
+DEFAULT_POLLS = ['/api/results/:5', '/api/audit-logs/unread-count/:30', '/api/check-election-end/:60']
+
+
+def session_cookie(base_url, email, password):
+    client = Client(base_url, Recorder())
+    status, _ = client.login(email, password)
+    if status != 200:
+        raise SystemExit(f"login failed: {status}")
+    return '; '.join(f"{cookie.name}={cookie.value}" for cookie in client.cookies)
+
+
+def open_url(base_url, path, cookie, timeout):
+    request = urllib.request.Request(base_url + path, headers={'Cookie': cookie, 'Accept': '*/*'})
+    return urllib.request.urlopen(request, timeout=timeout)
+
+
+def poll_client(args, cookie, polls, counters, deadline):
+    # Timers start at a random phase, like dashboards opened at different times
+    due = {path: time.monotonic() + random.uniform(0, interval) for path, interval in polls}
+    while True:
+        path = min(due, key=due.get)
+        wait = due[path] - time.monotonic()
+        if due[path] >= deadline:
+            return
+        if wait > 0:
+            time.sleep(wait)
+        counters.add('requests')
+        try:
+            with open_url(args.base_url, path, cookie, 30) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            counters.add(f"http_{e.code}")
+        except OSError:
+            counters.add('errors')
+        due[path] += dict(polls)[path]
+
+
+def stream_client(args, cookie, counters, deadline):
+    last_id = None
+    while time.monotonic() < deadline:
+        counters.add('requests')
+        try:
+            if args.long_poll:
+                query = '' if last_id is None else f"?since={last_id}&timeout=25"
+                with open_url(args.base_url, f"/api/events/poll/{query}", cookie, 35) as response:
+                    data = json.loads(response.read())
+                last_id = data['last_id']
+                counters.add('events', len(data['events']))
+                continue
+            with open_url(args.base_url, '/api/events/', cookie, 5) as response:
+                while time.monotonic() < deadline:
+                    try:
+                        line = response.readline()
+                    except socket.timeout:
+                        continue
+                    if not line:
+                        break
+                    if line.startswith(b'event:'):
+                        counters.add('events')
+        except urllib.error.HTTPError as e:
+            counters.add(f"http_{e.code}")
+            time.sleep(5)
+        except OSError:
+            counters.add('errors')
+            time.sleep(5)
+
+
+def run_mode(args, cookie, polls, mode):
+    counters = Counters()
+    deadline = time.monotonic() + args.duration
+    if mode == 'polling':
+        target = lambda: poll_client(args, cookie, polls, counters, deadline)
+    else:
+        target = lambda: stream_client(args, cookie, counters, deadline)
+    threads = [threading.Thread(target=target, daemon=True) for _ in range(args.clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()) + 40)
+    elapsed = time.monotonic() - started
+    counts = counters.snapshot()
+    row = dict(counts, requests_per_second=round(counts.get('requests', 0) / elapsed, 2))
+    print(f"{mode:<8} {json.dumps(row)}")
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=60.0)
+    parser.add_argument('--poll', action='append', metavar='PATH:SECONDS',
+                        help=f"endpoint polled in the polling mode (default: {', '.join(DEFAULT_POLLS)})")
+    parser.add_argument('--long-poll', action='store_true', help='use /api/events/poll/ instead of the SSE stream')
+    parser.add_argument('--output', help='where to write the JSON report')
+    args = parser.parse_args()
+
+    polls = [(entry.rsplit(':', 1)[0], float(entry.rsplit(':', 1)[1])) for entry in (args.poll or DEFAULT_POLLS)]
+    cookie = session_cookie(args.base_url, args.email, args.password)
+    report = {
+        'started_at': time.time(),
+        'base_url': args.base_url,
+        'clients': args.clients,
+        'duration_seconds': args.duration,
+        'polls': dict(polls),
+        'channel': 'long-poll' if args.long_poll else 'sse',
+        'polling': run_mode(args, cookie, polls, 'polling'),
+        'events': run_mode(args, cookie, polls, 'events'),
+    }
+    if report['events']['requests_per_second']:
+        report['reduction'] = round(report['polling']['requests_per_second'] / report['events']['requests_per_second'], 1)
+        print(f"polling/events request ratio: {report['reduction']}x")
+
+    output = args.output or f"election_events-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"report written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Activation email rendering microbenchmark.
+
+Times ACTIVATION_EMAIL.render() (precompiled string.Template with the CSS
+inlined at import) against the two per-request f-strings register_view
+built before, for the same username/link. Reports the mean time per
+render and the speedup, and writes them as JSON.
+
+Run it from the Django project root so the views module imports:
+
+    DJANGO_SETTINGS_MODULE=somase.settings \\
+        python path/to/bench/email_templates.py --views-module voting.views --renders 20000
+"""
+
+import argparse
+import json
+import time
+import timeit
+
+from common import load_views
+
+
+def legacy_activation_email(username, activation_url, year):
+    # register_view's f-strings before the templates were precompiled
+    mail_subject = 'Activate your MUBAS SOMASE Voting account'
+
+    html_content = f"""
+    <!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Email Verification</title>
+        <style>
+            body {{
+                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+                line-height: 1.6;
+                color: #333;
+                background-color: #f9f9f9;
+                margin: 0;
+                padding: 0;
+            }}
+            .container {{
+                max-width: 600px;
+                margin: 0 auto;
+                background-color: #ffffff;
+                padding: 20px;
+                border-radius: 8px;
+                box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+            }}
+            .header {{
+                text-align: center;
+                padding: 20px 0;
+                background-color: #1e4a76;
+                color: white;
+                border-radius: 8px 8px 0 0;
+            }}
+            .content {{
+                padding: 20px;
+            }}
+            .button {{
+                display: inline-block;
+                padding: 12px 24px;
+                background-color: #1e4a76;
+                color: white;
+                text-decoration: none;
+                border-radius: 4px;
+                margin: 20px 0;
+                font-weight: bold;
+            }}
+            .footer {{
+                text-align: center;
+                padding: 20px;
+                font-size: 12px;
+                color: #666;
+            }}
+            .verification-link {{
+                word-break: break-all;
+                color:#1e4a76;
+                font-weight: bold;
+            }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>MUBAS SOMASE</h1>
+                 <h2>Email Verification</h2>
+            </div>
+            <div class="content">
+                <h2>Hello {username},</h2>
+                <p>Thank you for registering as a MUBAS SOMASE member. To complete your registration, please verify your email address by clicking the button below:</p>
+
+                <center>
+                    <a style="color:white" href="{activation_url}" class="button">
+                        Verify Email Address
+                    </a>
+                </center>
+
+                <p>Or copy and paste the following link into your browser:</p>
+                <p class="verification-link">{activation_url}</p>
+
+                <p>If you didn't request this registration, please ignore this email.</p>
+
+                <p>Best regards,<br>The MUBAS SOMASE Team</p>
+            </div>
+            <div class="footer">
+                <p>This is an automated message. Please do not reply to this email.</p>
+                <p>&copy; {year} SOMASE Voting System. All rights reserved.</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+
+    text_content = f"""Hi {username},
+
+Please click on the link below to confirm your registration for the SOMASE Voting System:
+
+{activation_url}
+
+If you didn't register for this account, please ignore this email.
+
+Thank you,
+MUBAS SOMASE Team"""
+
+    return mail_subject, text_content, html_content
+
+
+def per_render_us(render, renders, repeat):
+    # Best of `repeat` runs, so scheduler noise does not count
+    best = min(timeit.repeat(render, number=renders, repeat=repeat))
+    return best / renders * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--views-module', required=True, help='dotted path of the views module, e.g. voting.views')
+    parser.add_argument('--renders', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='where to write the JSON report')
+    args = parser.parse_args()
+
+    views = load_views(args.views_module)
+    fields = {
+        'username': 'bench_user',
+        'activation_url': 'https://voting.example/activate/MTIz/c8x-0f1e2d3c4b5a69788796a5b4c3d2e1f0',
+        'year': 2026,
+    }
+
+    results = {
+        'fstring_us': per_render_us(lambda: legacy_activation_email(**fields), args.renders, args.repeat),
+        'template_us': per_render_us(lambda: views.ACTIVATION_EMAIL.render(**fields), args.renders, args.repeat),
+    }
+    legacy_html = legacy_activation_email(**fields)[2]
+    template_html = views.ACTIVATION_EMAIL.render(**fields)[2]
+
+    report = {
+        'started_at': time.time(),
+        'renders': args.renders,
+        'repeat': args.repeat,
+        'fstring_us': round(results['fstring_us'], 3),
+        'template_us': round(results['template_us'], 3),
+        'speedup': round(results['fstring_us'] / results['template_us'], 2),
+        'fstring_html_bytes': len(legacy_html.encode()),
+        'template_html_bytes': len(template_html.encode()),
+    }
+    for key, value in report.items():
+        print(f"{key:<20} {value}")
+
+    output = args.output or f"email_templates-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"report written to {output}")
+
+
+if __name__ == '__main__':
+    main()
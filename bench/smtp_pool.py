@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+SMTP handshake benchmark for the shared connection pool.
+
+Sends --messages emails through the local SMTP stand-in twice, on
+--concurrency threads: once with Django's stock SMTP backend (a fresh
+connection and AUTH per message, as every mail path did before the pool)
+and once through get_mail_connection(), the pooled backend every path uses
+now. The stand-in counts TCP connections and AUTH logins, so the report
+shows the handshakes per message for each mode, plus wall time and
+throughput. --latency adds a delay to every delivery to mimic a slow relay.
+
+The stand-in has no TLS, so the run forces EMAIL_USE_TLS off; a STARTTLS
+would sit on the same per-connection path as the counted AUTH. Run it from
+the Django project root so the views module imports:
+
+    DJANGO_SETTINGS_MODULE=somase.settings \\
+        python path/to/bench/smtp_pool.py --views-module voting.views --messages 500 --concurrency 8
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import load_views, start_smtp_server
+
+
+def send_all(connection_factory, messages, concurrency):
+    from django.core.mail import EmailMessage
+
+    def send(index):
+        connection = connection_factory()
+        try:
+            EmailMessage(
+                f"Bench message {index}",
+                'SMTP pool benchmark',
+                'bench@bench.invalid',
+                [f"voter{index}@bench.invalid"],
+                connection=connection
+            ).send(fail_silently=False)
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, range(messages)))
+    return time.perf_counter() - started
+
+
+def measure(smtp, label, connection_factory, messages, concurrency):
+    before = smtp.stats.snapshot()
+    elapsed = send_all(connection_factory, messages, concurrency)
+    after = smtp.stats.snapshot()
+    counts = {name: after.get(name, 0) - before.get(name, 0) for name in ('connections', 'logins', 'messages')}
+    row = {
+        'messages': counts['messages'],
+        'connections': counts['connections'],
+        'logins': counts['logins'],
+        'handshakes_per_message': round(counts['logins'] / counts['messages'], 4) if counts['messages'] else None,
+        'seconds': round(elapsed, 3),
+        'messages_per_second': round(counts['messages'] / elapsed, 2) if elapsed else 0.0,
+    }
+    print(f"{label:<10} {row['messages']:>8} {row['connections']:>11} {row['logins']:>7} "
+          f"{row['handshakes_per_message']:>10} {row['seconds']:>8} {row['messages_per_second']:>8}")
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--views-module', required=True, help='dotted path of the views module, e.g. voting.views')
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every delivery')
+    parser.add_argument('--smtp-host', default='localhost')
+    parser.add_argument('--smtp-port', type=int, default=1026)
+    parser.add_argument('--output', help='where to write the JSON report')
+    args = parser.parse_args()
+
+    views = load_views(args.views_module)
+    from django.conf import settings
+    from django.core.mail.backends.smtp import EmailBackend
+
+    smtp = start_smtp_server(args.smtp_host, args.smtp_port, latency=args.latency)
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    settings.EMAIL_HOST, settings.EMAIL_PORT = args.smtp_host, args.smtp_port
+    settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD = 'bench', 'bench'
+    settings.EMAIL_USE_TLS = settings.EMAIL_USE_SSL = False
+
+    print(f"{'mode':<10} {'messages':>8} {'connections':>11} {'logins':>7} {'per msg':>10} {'seconds':>8} {'msg/s':>8}")
+    report = {
+        'started_at': time.time(),
+        'messages': args.messages,
+        'concurrency': args.concurrency,
+        'latency': args.latency,
+        'unpooled': measure(smtp, 'unpooled', EmailBackend, args.messages, args.concurrency),
+        'pooled': measure(smtp, 'pooled', views.get_mail_connection, args.messages, args.concurrency),
+        'pool_stats': views.get_smtp_pool().stats(),
+    }
+    views.get_smtp_pool().close_all()
+    smtp.shutdown()
+
+    output = args.output or f"smtp_pool-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"report written to {output}")
+
+
+if __name__ == '__main__':
+    main()
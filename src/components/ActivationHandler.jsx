@@ -4,22 +4,39 @@ import { useParams, useNavigate } from 'react-router-dom';
 import Swal from 'sweetalert2';
 import { BASE_URL } from '../config';
 
+// One request per link, even when the effect runs twice (StrictMode) or the
+// handler remounts while the first request is still in flight
+const activationRequests = new Map();
+
+const requestActivation = (uidb64, token) => {
+    const key = `${uidb64}/${token}`;
+    if (!activationRequests.has(key)) {
+        const request = fetch(`${BASE_URL}/activate/${uidb64}/${token}/`, {
+            method: 'GET',
+            credentials: 'include',
+        }).then(async (response) => ({ ok: response.ok, data: await response.json() }));
+        
+        // Let a failed request be retried
+        request.catch(() => activationRequests.delete(key));
+        activationRequests.set(key, request);
+    }
+    return activationRequests.get(key);
+};
+
 const ActivationHandler = () => {
     const { uidb64, token } = useParams();
     const navigate = useNavigate();
     const [status, setStatus] = useState('loading');
 
     useEffect(() => {
+        let cancelled = false;
+        
         const activateAccount = async () => {
             try {
-                const response = await fetch(`${BASE_URL}/activate/${uidb64}/${token}/`, {
-                    method: 'GET',
-                    credentials: 'include',
-                });
-
-                const data = await response.json();
+                const { ok, data } = await requestActivation(uidb64, token);
+                if (cancelled) return;
 
-                if (response.ok && data.success) {
+                if (ok && data.success) {
                     setStatus('success');
                     
                     // Show success message
@@ -47,6 +64,7 @@ const ActivationHandler = () => {
                     window.location.href = data.redirect_url || '/register';
                 }
             } catch (error) {
+                if (cancelled) return;
                 setStatus('error');
                 
                 await Swal.fire({
@@ -61,6 +79,10 @@ const ActivationHandler = () => {
         };
 
         activateAccount();
+        
+        return () => {
+            cancelled = true;
+        };
     }, [uidb64, token, navigate]);
 
     return (
@@ -1,9 +1,10 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import './ElectionDashboard.css';
 import Swal from 'sweetalert2';
 import somaselogo from '../images/somase-logo.jpeg';
 import { BASE_URL } from '../config';
 import { ensureCSRFToken, getCookie } from '../utils/csrf';
+import { subscribeToElectionEvents } from '../utils/electionEvents';
 
 const ElectionDashboard = () => {
   const [activePage, setActivePage] = useState('dashboard');
@@ -36,6 +37,8 @@ const [countdownType, setCountdownType] = useState(null); // 'start' or 'end'
     totalVotes: 0,
     candidates: []
   });
+  // Set once the server serves the frozen end-of-election snapshot
+  const [resultsFinal, setResultsFinal] = useState(false);
   const [electionSettings, setElectionSettings] = useState({
     start_year: 2022,
     end_year: 2025,
@@ -52,6 +55,7 @@ const [countdownType, setCountdownType] = useState(null); // 'start' or 'end'
   const [searchQuery, setSearchQuery] = useState('');
   const [moderators, setModerators] = useState([]);
   const [auditLogs, setAuditLogs] = useState([]);
+const [auditLogsCursor, setAuditLogsCursor] = useState(null);
 const [auditLogsLoading, setAuditLogsLoading] = useState(false);
 const [auditLogsError, setAuditLogsError] = useState(null);
 const [unreadAuditCount, setUnreadAuditCount] = useState(0);
@@ -60,6 +64,8 @@ const [auditLogsToShow, setAuditLogsToShow] = useState(5);
 const [moderatorsToShow, setModeratorsToShow] = useState(5);
 const [timeUntilStart, setTimeUntilStart] = useState(null);
 const [electionStatus, setElectionStatus] = useState('checking'); 
+const resultsEtagRef = useRef(null);
+const conditionalResultsRef = useRef(true);
 // Function to calculate time until election starts or ends
 const calculateTimeRemaining = () => {
   if (!electionSettings.start_date || !electionSettings.end_date) {
@@ -137,6 +143,31 @@ useEffect(() => {
   setElectionStarted(false);
 }, [electionSettings]);
 
+// Resolve with the final state of a background job (chunked deletes run
+// server-side after the request returns 202 with a job id)
+const waitForBackgroundJob = (jobId) => new Promise((resolve, reject) => {
+  const intervalId = setInterval(async () => {
+    try {
+      const response = await fetch(`${BASE_URL}/api/jobs/${jobId}/`, {
+        credentials: 'include'
+      });
+      if (!response.ok) {
+        clearInterval(intervalId);
+        reject(new Error(`Job status request failed: ${response.status}`));
+        return;
+      }
+      const job = await response.json();
+      if (job.status === 'completed' || job.status === 'failed') {
+        clearInterval(intervalId);
+        resolve(job);
+      }
+    } catch (err) {
+      clearInterval(intervalId);
+      reject(err);
+    }
+  }, 2000);
+});
+
 const deleteAllCandidates = async () => {
   try {
     const result = await Swal.fire({
@@ -164,7 +195,16 @@ const deleteAllCandidates = async () => {
         credentials: 'include'
       });
 
-      if (response.ok) {
+      const data = response.ok ? await response.json() : null;
+      const job = data && data.job_id ? await waitForBackgroundJob(data.job_id) : null;
+      if (job && job.status === 'failed') {
+        Swal.fire({
+          icon: 'error',
+          title: 'Error',
+          text: job.error || 'Error deleting applications'
+        });
+        fetchCandidates();
+      } else if (response.ok) {
         Swal.fire({
           icon: 'success',
           title: 'Applications Deleted',
@@ -345,8 +385,8 @@ const markAuditLogsAsRead = async () => {
     
     if (response.ok) {
       setUnreadAuditCount(0);
-      // Refresh audit logs to update read status
-      fetchAuditLogs();
+      // Update read status locally instead of refetching every log
+      setAuditLogs(prev => prev.map(log => ({ ...log, is_read: true })));
     }
   } catch (err) {
     console.error('Error marking audit logs as read:', err);
@@ -411,12 +451,14 @@ const clearAuditLogs = async () => {
 // Update the useEffect for audit logs to also fetch unread count
 useEffect(() => {
   if (activePage === 'audit') {
-    fetchAuditLogs();
-    markAuditLogsAsRead(); // Mark as read when opened
+    // Mark as read once the page has loaded, so the local is_read flip
+    // applies to the fetched logs instead of being overwritten by them
+    fetchAuditLogs().then(markAuditLogsAsRead);
   }
 }, [activePage]);
 
-// Fetch unread count on component mount and periodically
+// Fetch unread count on component mount and poll; an audit_log event only
+// makes the update immediate
 useEffect(() => {
   fetchUnreadAuditLogsCount();
   const intervalId = setInterval(fetchUnreadAuditLogsCount, 30000); // Update every 30 seconds
@@ -456,11 +498,15 @@ const handleLogout = async () => {
     });
   }
 };
-// Fetch audit logs from backend
-const fetchAuditLogs = async () => {
+// Fetch audit logs from backend one page at a time; pass the cursor from
+// the previous page to append older entries
+const AUDIT_LOGS_PAGE_SIZE = 50;
+const fetchAuditLogs = async (cursor = null) => {
   try {
-    setAuditLogsLoading(true);
-    const response = await fetch(`${BASE_URL}/api/audit-logs/`, {
+    if (!cursor) setAuditLogsLoading(true);
+    const params = new URLSearchParams({ limit: AUDIT_LOGS_PAGE_SIZE });
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`${BASE_URL}/api/audit-logs/?${params}`, {
       credentials: 'include'
     });
     
@@ -469,7 +515,8 @@ const fetchAuditLogs = async () => {
     }
     
     const data = await response.json();
-    setAuditLogs(data.logs);
+    setAuditLogs(prev => (cursor ? [...prev, ...data.logs] : data.logs));
+    setAuditLogsCursor(data.next_cursor || null);
     setAuditLogsError(null);
   } catch (err) {
     console.error('Error fetching audit logs:', err);
@@ -479,13 +526,6 @@ const fetchAuditLogs = async () => {
   }
 };
 
-// Fetch audit logs when audit page is active
-useEffect(() => {
-  if (activePage === 'audit') {
-    fetchAuditLogs();
-  }
-}, [activePage]);
-
 // Format date function
 const formatAuditLogDate = (dateString) => {
   const date = new Date(dateString);
@@ -507,8 +547,11 @@ const formatAuditLogDate = (dateString) => {
   const fetchCandidates = async () => {
     try {
       setLoading(true);
+      // Revalidate against the browser's cached copy; an unchanged list
+      // comes back as a bodiless 304 keyed on the server's ETag
       const response = await fetch(`${BASE_URL}/api/candidates/applications/`, {
-        credentials: 'include'
+        credentials: 'include',
+        cache: 'no-cache'
       });
       
       if (!response.ok) {
@@ -527,17 +570,42 @@ const formatAuditLogDate = (dateString) => {
   };
 
   // Fetch real-time data
-  const fetchRealTimeData = async () => {
+  // Polls revalidate with the last ETag so unchanged results come back as
+  // an empty 304 and skip the re-render. If-None-Match is not a
+  // CORS-safelisted header: the API has to allow it in preflights and
+  // expose ETag. Without the exposed ETag no conditional request is made;
+  // if the preflight rejects the header, polls fall back to plain fetches.
+  const fetchRealTimeData = async ({ force = false } = {}) => {
+    const conditional = Boolean(resultsEtagRef.current) && conditionalResultsRef.current && !force;
     try {
+      const headers = {};
+      if (conditional) {
+        headers['If-None-Match'] = resultsEtagRef.current;
+      }
       const response = await fetch(`${BASE_URL}/api/results/`, {
-        credentials: 'include'
+        credentials: 'include',
+        cache: 'no-store',
+        headers
       });
       
+      if (response.status === 304) {
+        return;
+      }
+      
       if (response.ok) {
+        resultsEtagRef.current = response.headers.get('ETag');
         const data = await response.json();
         setRealTimeData(data);
+        setResultsFinal(Boolean(data.final));
       }
     } catch (err) {
+      if (conditional) {
+        // A rejected preflight surfaces as a network error; retry once
+        // without the header and stop sending it
+        conditionalResultsRef.current = false;
+        resultsEtagRef.current = null;
+        return fetchRealTimeData({ force: true });
+      }
       console.error('Error fetching real-time data:', err);
     }
   };
@@ -569,7 +637,17 @@ const resetAllVotes = async () => {
         credentials: 'include'
       });
 
-      if (response.ok) {
+      const data = response.ok ? await response.json() : null;
+      const job = data && data.job_id ? await waitForBackgroundJob(data.job_id) : null;
+      if (job && job.status === 'failed') {
+        Swal.fire({
+          icon: 'error',
+          title: 'Error',
+          text: job.error || 'Error resetting votes'
+        });
+        fetchRealTimeData({ force: true });
+        fetchCandidates();
+      } else if (response.ok) {
         Swal.fire({
           icon: 'success',
           title: 'Votes Reset Successfully',
@@ -579,7 +657,7 @@ const resetAllVotes = async () => {
         });
         
         // Refresh data
-        fetchRealTimeData();
+        fetchRealTimeData({ force: true });
         fetchCandidates();
         
         // Create audit log entry
@@ -925,11 +1003,17 @@ const startElection = async (isAutomatic = false) => {
             'Content-Type': 'application/json',
             'X-CSRFToken': csrfToken,
           },
-          credentials: 'include'
+          credentials: 'include',
+          body: JSON.stringify({
+            election_title: electionSettings.election_title,
+            end_date: new Date(electionSettings.end_date).toLocaleString()
+          })
         });
         
         if (emailResponse.ok) {
-          console.log('Election start emails sent successfully');
+          const emailData = await emailResponse.json();
+          console.log('Election start emails queued, job:', emailData.job_id);
+          pollElectionEmailJob(emailData.job_id);
         } else {
           console.error('Failed to send election start emails');
           // Even if email sending fails, we should still proceed
@@ -988,6 +1072,33 @@ const startElection = async (isAutomatic = false) => {
   }
 };
 
+// Poll the bulk email job started alongside the election until it finishes
+const pollElectionEmailJob = (jobId) => {
+  if (!jobId) return;
+  const intervalId = setInterval(async () => {
+    try {
+      const response = await fetch(`${BASE_URL}/api/send-election-start-emails/${jobId}/status/`, {
+        credentials: 'include'
+      });
+      if (!response.ok) {
+        clearInterval(intervalId);
+        return;
+      }
+      const job = await response.json();
+      console.log(`Election start emails: ${job.sent}/${job.total} sent, ${job.failed} failed`);
+      if (job.status === 'completed' || job.status === 'failed') {
+        clearInterval(intervalId);
+        if (job.failed > 0) {
+          console.error(`${job.failed} election start emails could not be delivered`);
+        }
+      }
+    } catch (err) {
+      console.error('Error checking election email progress:', err);
+      clearInterval(intervalId);
+    }
+  }, 3000);
+};
+
 const cancelElection = async () => {
   try {
     const result = await Swal.fire({
@@ -1082,6 +1193,9 @@ useEffect(() => {
             
             // Stop the countdown
             setElectionCountdown(null);
+            
+            // Pick up the frozen final results
+            fetchRealTimeData({ force: true });
           }
         }
       } catch (err) {
@@ -1286,20 +1400,46 @@ useEffect(() => {
     fetchElectionSettings();
   }, []);
 
+  // Subscribe to pushed election updates
+  useEffect(() => {
+    return subscribeToElectionEvents(BASE_URL, {
+      election_start: () => {
+        fetchElectionSettings();
+        fetchRealTimeData({ force: true });
+      },
+      election_end: () => {
+        fetchElectionSettings();
+        fetchRealTimeData({ force: true });
+      },
+      settings_changed: () => fetchElectionSettings(),
+      audit_log: (data) => {
+        if (typeof data.unread_count === 'number') {
+          setUnreadAuditCount(data.unread_count);
+        } else {
+          fetchUnreadAuditLogsCount();
+        }
+      },
+      results: () => fetchRealTimeData(),
+    });
+  }, []);
+
   // Set up real-time data polling
   useEffect(() => {
     let intervalId;
     
     if (activePage === 'dashboard' || activePage === 'results') {
-      // Fetch real-time data immediately and set up interval
+      // Fetch real-time data immediately and keep polling while the election
+      // is open; a results event only makes the update immediate
       fetchRealTimeData();
-      intervalId = setInterval(fetchRealTimeData, 5000); // Update every 5 seconds
+      if (!resultsFinal) {
+        intervalId = setInterval(fetchRealTimeData, 5000); // Update every 5 seconds
+      }
     }
     
     return () => {
       if (intervalId) clearInterval(intervalId);
     };
-  }, [activePage]);
+  }, [activePage, resultsFinal]);
 
   // Navigation handler
   const handleNavigation = (pageId) => {
@@ -2052,12 +2192,26 @@ const renderCountdown = () => {
       <div className="content-section">
         <div className="section-header">
           <h2 className="section-title"><i className="fas fa-chart-bar"></i> Election Results</h2>
-          <div className="real-time-indicator">
-            <span className="real-time-pulse"></span>
-            Live Updates
-          </div>
+          {resultsFinal ? (
+            <div className="real-time-indicator">
+              <i className="fas fa-lock"></i>
+              Final Results
+            </div>
+          ) : (
+            <div className="real-time-indicator">
+              <span className="real-time-pulse"></span>
+              Live Updates
+            </div>
+          )}
           {isResultsPage && (
-            <button className="btn btn-primary"><i className="fas fa-download"></i> Export Results</button>
+            <button
+              className="btn btn-primary"
+              disabled={!resultsFinal}
+              title={resultsFinal ? '' : 'Available once the election has ended'}
+              onClick={() => window.open(`${BASE_URL}/api/results/export/`, '_blank')}
+            >
+              <i className="fas fa-download"></i> Export Results
+            </button>
           )}
         </div>
         
@@ -2299,7 +2453,7 @@ const renderAuditLog = () => (
     <div className="section-header">
       <h2 className="section-title"><i className="fas fa-history"></i> Audit Log</h2>
       <div>
-        <button className="btn btn-primary" onClick={fetchAuditLogs}>
+        <button className="btn btn-primary" onClick={() => fetchAuditLogs()}>
           <i className="fas fa-sync-alt"></i> Refresh
         </button>
         <button className="btn btn-info" onClick={markAuditLogsAsRead} style={{marginLeft: '10px'}}>
@@ -2324,7 +2478,7 @@ const renderAuditLog = () => (
       <div className="error-state">
         <i className="fas fa-exclamation-triangle"></i>
         <p>Error loading audit logs: {auditLogsError}</p>
-        <button onClick={fetchAuditLogs}>Try Again</button>
+        <button onClick={() => fetchAuditLogs()}>Try Again</button>
       </div>
     )}
     
@@ -2377,6 +2531,16 @@ const renderAuditLog = () => (
             )}
           </div>
         )}
+        {auditLogsCursor && (
+          <div className="table-controls">
+            <button 
+              className="btn btn-primary load-more-btn"
+              onClick={() => fetchAuditLogs(auditLogsCursor)}
+            >
+              <i className="fas fa-history"></i> Load Older Entries
+            </button>
+          </div>
+        )}
       </div>
     )}
   </div>
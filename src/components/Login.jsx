@@ -3,7 +3,7 @@ import React, { useState, useCallback } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { Helmet } from 'react-helmet';
 import './Login.css';
-import { getCookie } from '../utils/csrf';
+import { getCookie, clearCSRFToken } from '../utils/csrf';
 import somaselogo from '../images/somase-logo.jpeg';
 import Swal from 'sweetalert2';
 import { BASE_URL } from '../config';
@@ -119,6 +119,9 @@ const Login = () => {
             }
             
             if (response.ok) {
+                // Django rotates the CSRF token on login
+                clearCSRFToken();
+                
                 // Store basic user data in localStorage
                 localStorage.setItem('user', JSON.stringify(responseData));
                 
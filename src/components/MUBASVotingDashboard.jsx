@@ -1,9 +1,10 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import Swal from 'sweetalert2';
 import './votingDB.css';
 import somaselogo from '../images/somase-logo.jpeg';
 import { BASE_URL } from '../config';
 import { ensureCSRFToken, getCookie } from '../utils/csrf';
+import { subscribeToElectionEvents } from '../utils/electionEvents';
 
 const MUBASVotingDashboard = () => {
   // State management
@@ -23,6 +24,8 @@ const MUBASVotingDashboard = () => {
   const [hasUserVoted, setHasUserVoted] = useState(false);
   const [isCheckingEligibility, setIsCheckingEligibility] = useState(true);
   const [isSubmittingAll, setIsSubmittingAll] = useState(false);
+  // Set synchronously so a double click cannot post the ballot twice
+  const ballotInFlightRef = useRef(false);
   const [showMobileMenu, setShowMobileMenu] = useState(false);
   const [myApplication, setMyApplication] = useState(null);
   const [showApplicationModal, setShowApplicationModal] = useState(false);
@@ -214,6 +217,15 @@ const handleDeleteAccount = async () => {
     }
   }, []);
 
+  // Refresh settings when the election is started, ended or changed
+  useEffect(() => {
+    return subscribeToElectionEvents(BASE_URL, {
+      election_start: () => fetchElectionSettings(),
+      election_end: () => fetchElectionSettings(),
+      settings_changed: () => fetchElectionSettings(),
+    });
+  }, []);
+
   // Add this useEffect to handle the election countdown
   useEffect(() => {
     const updateElectionStatus = () => {
@@ -295,8 +307,11 @@ const handleDeleteAccount = async () => {
   const fetchCandidates = async () => {
     try {
       setLoading(true);
+      // Revalidate against the browser's cached copy; an unchanged list
+      // comes back as a bodiless 304 keyed on the server's ETag
       const response = await fetch(`${BASE_URL}/api/candidates/`, {
-        credentials: 'include'
+        credentials: 'include',
+        cache: 'no-cache'
       });
       
       if (!response.ok) {
@@ -424,8 +439,11 @@ const handleDeleteAccount = async () => {
       return;
     }
     
+    if (ballotInFlightRef.current) return;
+    
     // Submit all votes
     try {
+      ballotInFlightRef.current = true;
       setIsSubmittingAll(true);
       
       // Prepare votes data
@@ -462,6 +480,17 @@ const handleDeleteAccount = async () => {
           icon: 'success',
           confirmButtonText: 'OK'
         });
+      } else if (response.status === 409) {
+        // The server already holds a ballot for this voter
+        setHasUserVoted(true);
+        localStorage.removeItem('somasVotes');
+        
+        Swal.fire({
+          title: 'Already Voted',
+          text: 'Your ballot has already been recorded for this election.',
+          icon: 'info',
+          confirmButtonText: 'OK'
+        });
       } else {
         const errorText = await response.text();
         throw new Error(errorText || 'Failed to submit votes');
@@ -475,6 +504,7 @@ const handleDeleteAccount = async () => {
         confirmButtonText: 'OK'
       });
     } finally {
+      ballotInFlightRef.current = false;
       setIsSubmittingAll(false);
     }
   };
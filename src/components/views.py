@@ -1,4 +1,2981 @@
+import os
+import re
+import io
+import csv
+import gzip
+import hashlib
+import contextvars
+import uuid
+import time
+import smtplib
+import threading
+from contextlib import contextmanager
+from html import escape as html_escape
+from string import Template
 
+from django.core.mail.backends.smtp import EmailBackend as SMTPEmailBackend
+from django.core.signals import request_started
+from django.contrib.auth.signals import user_logged_out
+from django.db import IntegrityError, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+try:
+    import aiosmtplib
+except ImportError:
+    aiosmtplib = None
+
+
+# ---------------------------------------------------------------------------
+# Instrumentation
+#
+# PerformanceMiddleware times every request and counts its DB queries;
+# span() times the external calls inside a view (DB, SMTP, image store...).
+# Both feed process-wide latency histograms exposed in Prometheus text
+# format by metrics_view, and requests slower than SLOW_REQUEST_THRESHOLD_MS
+# are logged with their phase breakdown.
+# ---------------------------------------------------------------------------
+
+class LatencyHistogram:
+    """
+    Cumulative latency histogram with fixed bucket bounds in seconds
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, buckets=None):
+        self.buckets = tuple(buckets or self.BUCKETS)
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+
+    def observe(self, seconds):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    self._counts[i] += 1
+                    break
+            else:
+                self._counts[-1] += 1
+            self._sum += seconds
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets + ('+Inf',), counts):
+            running += count
+            cumulative.append((str(bound), running))
+        return {'buckets': dict(cumulative), 'count': running, 'sum': round(total, 6)}
+
+
+_request_metrics = contextvars.ContextVar('request_metrics', default=None)
+_metrics_lock = threading.Lock()
+REQUEST_HISTOGRAMS = {}
+PHASE_HISTOGRAMS = {}
+REQUEST_QUERY_TOTALS = {}
+
+
+def _histogram(registry, key):
+    with _metrics_lock:
+        if key not in registry:
+            registry[key] = LatencyHistogram()
+        return registry[key]
+
+
+@contextmanager
+def span(name):
+    """
+    Time a block as phase `name` of the current request (if any) and in
+    the process-wide phase histogram
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _histogram(PHASE_HISTOGRAMS, name).observe(elapsed)
+        metrics = _request_metrics.get()
+        if metrics is not None:
+            metrics['phases'][name] = metrics['phases'].get(name, 0) + elapsed
+
+
+def _count_queries(execute, sql, params, many, context):
+    metrics = _request_metrics.get()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if metrics is not None:
+            metrics['queries'] += 1
+            metrics['phases']['db'] = metrics['phases'].get('db', 0) + time.perf_counter() - start
+
+
+@receiver(connection_created)
+def _install_query_counter(sender, connection, **kwargs):
+    # Installed on every connection rather than around the request, so
+    # queries run by async views in sync_to_async threads are counted too;
+    # the context variable carries the request's metrics into those threads
+    if _count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_queries)
+
+
+class PerformanceMiddleware:
+    """
+    Per-request timing, DB query counting, Server-Timing header and
+    slow-request logging. Runs natively under both WSGI and ASGI, so async
+    views are not pushed onto a thread per request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics = {'phases': {}, 'queries': 0}
+        token = _request_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+        return self._record(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics = {'phases': {}, 'queries': 0}
+        token = _request_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+        return self._record(request, response, metrics, time.perf_counter() - start)
+
+    def _record(self, request, response, metrics, elapsed):
+        from django.conf import settings
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else 'unresolved'
+        _histogram(REQUEST_HISTOGRAMS, view).observe(elapsed)
+        with _metrics_lock:
+            REQUEST_QUERY_TOTALS[view] = REQUEST_QUERY_TOTALS.get(view, 0) + metrics['queries']
+
+        phases = metrics['phases']
+        response['Server-Timing'] = ', '.join(
+            [f"{name};dur={duration * 1000:.1f}" for name, duration in phases.items()]
+            + [f"total;dur={elapsed * 1000:.1f}"]
+        )
+
+        threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 1000)
+        if elapsed * 1000 >= threshold:
+            breakdown = ', '.join(f"{name}={duration * 1000:.1f}ms" for name, duration in phases.items())
+            logger.warning(
+                f"Slow request {request.method} {request.path} ({view}): {elapsed * 1000:.1f}ms, "
+                f"{metrics['queries']} queries [{breakdown or 'no phases recorded'}]"
+            )
+        return response
+
+
+def _prometheus_histogram(lines, name, help_text, label, histograms):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, histogram in sorted(histograms.items()):
+        snapshot = histogram.snapshot()
+        for bound, count in snapshot['buckets'].items():
+            lines.append(f'{name}_bucket{{{label}="{key}",le="{bound}"}} {count}')
+        lines.append(f'{name}_sum{{{label}="{key}"}} {snapshot["sum"]}')
+        lines.append(f'{name}_count{{{label}="{key}"}} {snapshot["count"]}')
+
+
+def render_metrics():
+    """
+    All collected metrics in Prometheus text exposition format
+    """
+    with _metrics_lock:
+        requests = dict(REQUEST_HISTOGRAMS)
+        phases = dict(PHASE_HISTOGRAMS)
+        query_totals = dict(REQUEST_QUERY_TOTALS)
+
+    lines = []
+    _prometheus_histogram(lines, 'somase_request_duration_seconds', 'Request duration by view.', 'view', requests)
+    _prometheus_histogram(lines, 'somase_phase_duration_seconds', 'Duration of timed phases (DB, SMTP, image store...).', 'phase', phases)
+
+    lines.append("# HELP somase_db_queries_total DB queries issued, by view.")
+    lines.append("# TYPE somase_db_queries_total counter")
+    for view, total in sorted(query_totals.items()):
+        lines.append(f'somase_db_queries_total{{view="{view}"}} {total}')
+
+    if _smtp_pool is not None:
+        pool_stats = _smtp_pool.stats()
+        lines.append("# HELP somase_smtp_handshakes_total SMTP connect+TLS+AUTH handshakes by the pool.")
+        lines.append("# TYPE somase_smtp_handshakes_total counter")
+        lines.append(f"somase_smtp_handshakes_total {pool_stats['handshakes']}")
+        lines.append("# HELP somase_smtp_reuses_total Pooled SMTP connections reused.")
+        lines.append("# TYPE somase_smtp_reuses_total counter")
+        lines.append(f"somase_smtp_reuses_total {pool_stats['reuses']}")
+
+    if _email_diagnostics is not None:
+        _prometheus_histogram(
+            lines, 'somase_smtp_probe_seconds', 'SMTP probe latency by phase.', 'phase',
+            _email_diagnostics.histograms
+        )
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint; only answers addresses in INTERNAL_IPS
+    """
+    from django.conf import settings
+    from django.http import HttpResponse, HttpResponseForbidden
+
+    allowed = getattr(settings, 'INTERNAL_IPS', None) or ['127.0.0.1', '::1']
+    if request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# ---------------------------------------------------------------------------
+# SMTP connection pool
+#
+# Every mail path borrows an authenticated connection from here instead of
+# building its own SMTP/STARTTLS/AUTH session. Idle connections are checked
+# with NOOP before reuse and replaced if the server has dropped them.
+# ---------------------------------------------------------------------------
+
+class SMTPConnectionPool:
+    """
+    Process-wide pool of authenticated SMTP connections, capped per host
+    """
+
+    def __init__(self, max_connections=4, idle_timeout=120, timeout=15):
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._slots = {}
+        self.handshakes = 0
+        self.reuses = 0
+
+    def _key(self, host, port, username):
+        return (host, port, username)
+
+    def _slot(self, key):
+        with self._lock:
+            if key not in self._slots:
+                self._slots[key] = threading.BoundedSemaphore(self.max_connections)
+            return self._slots[key]
+
+    def _connect(self, host, port, username, password, use_tls):
+        server = smtplib.SMTP(host, port, timeout=self.timeout)
+        try:
+            if use_tls:
+                server.starttls()
+            if username:
+                server.login(username, password)
+        except Exception:
+            server.close()
+            raise
+        with self._lock:
+            self.handshakes += 1
+        return server
+
+    def _take_idle(self, key):
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    return None
+                server, last_used = idle.pop()
+
+            if now - last_used <= self.idle_timeout:
+                try:
+                    if server.noop()[0] == 250:
+                        with self._lock:
+                            self.reuses += 1
+                        return server
+                except smtplib.SMTPException:
+                    pass
+                except OSError:
+                    pass
+            self._discard(server)
+
+    def _discard(self, server):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def acquire(self, host=None, port=None, username=None, password=None, use_tls=None):
+        """
+        Borrow a live, authenticated connection. Blocks while the host is at
+        its concurrency cap.
+        """
+        from django.conf import settings
+
+        host = host or settings.EMAIL_HOST
+        port = port or settings.EMAIL_PORT
+        username = settings.EMAIL_HOST_USER if username is None else username
+        password = settings.EMAIL_HOST_PASSWORD if password is None else password
+        use_tls = settings.EMAIL_USE_TLS if use_tls is None else use_tls
+
+        key = self._key(host, port, username)
+        slot = self._slot(key)
+        slot.acquire()
+        try:
+            server = self._take_idle(key)
+            if server is None:
+                with span('smtp.handshake'):
+                    server = self._connect(host, port, username, password, use_tls)
+        except Exception:
+            slot.release()
+            raise
+        server._pool_key = key
+        return server
+
+    def release(self, server, broken=False):
+        """
+        Return a borrowed connection; broken connections are closed instead
+        """
+        key = server._pool_key
+        if broken:
+            self._discard(server)
+        else:
+            with self._lock:
+                self._idle.setdefault(key, []).append((server, time.monotonic()))
+        self._slot(key).release()
+
+    @contextmanager
+    def connection(self, **kwargs):
+        server = self.acquire(**kwargs)
+        broken = False
+        try:
+            yield server
+        except (smtplib.SMTPServerDisconnected, OSError):
+            broken = True
+            raise
+        finally:
+            self.release(server, broken=broken)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for server, _ in connections:
+                self._discard(server)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'handshakes': self.handshakes,
+                'reuses': self.reuses,
+                'idle': sum(len(c) for c in self._idle.values()),
+            }
+
+
+def _build_smtp_pool():
+    from django.conf import settings
+
+    return SMTPConnectionPool(
+        max_connections=getattr(settings, 'EMAIL_POOL_MAX_CONNECTIONS', 4),
+        idle_timeout=getattr(settings, 'EMAIL_POOL_IDLE_SECONDS', 120),
+        timeout=getattr(settings, 'EMAIL_TIMEOUT', None) or 15,
+    )
+
+
+_smtp_pool = None
+_smtp_pool_lock = threading.Lock()
+
+
+def get_smtp_pool():
+    global _smtp_pool
+
+    with _smtp_pool_lock:
+        if _smtp_pool is None:
+            _smtp_pool = _build_smtp_pool()
+    return _smtp_pool
+
+
+class PooledEmailBackend(SMTPEmailBackend):
+    """
+    Django SMTP backend that borrows its connection from the shared pool
+    instead of opening and quitting a session per send
+    """
+
+    def open(self):
+        if self.connection:
+            return False
+        try:
+            self.connection = get_smtp_pool().acquire(
+                host=self.host,
+                port=self.port,
+                username=self.username,
+                password=self.password,
+                use_tls=self.use_tls,
+            )
+        except (smtplib.SMTPException, OSError):
+            if not self.fail_silently:
+                raise
+            return False
+        return True
+
+    def close(self):
+        if self.connection is None:
+            return
+        server, self.connection = self.connection, None
+        get_smtp_pool().release(server, broken=getattr(server, 'sock', None) is None)
+
+
+def get_mail_connection(fail_silently=False):
+    """
+    Connection for outbound mail: pooled when SMTP is configured, otherwise
+    whatever EMAIL_BACKEND is set (locmem, filebased, console...)
+    """
+    from django.conf import settings
+    from django.core.mail import get_connection
+
+    if settings.EMAIL_BACKEND == 'django.core.mail.backends.smtp.EmailBackend':
+        return PooledEmailBackend(fail_silently=fail_silently)
+    return get_connection(fail_silently=fail_silently)
+
+
+# ---------------------------------------------------------------------------
+# Outbound mail queue
+#
+# Messages are spooled as JSON files under EMAIL_QUEUE_DIR so they survive a
+# worker restart. A local worker thread drains the spool through whatever
+# EMAIL_BACKEND is configured (SMTP in production, locmem/filebased in tests).
+# ---------------------------------------------------------------------------
+
+_mail_worker = None
+_mail_worker_lock = threading.Lock()
+_mail_queue_event = threading.Event()
+
+
+def _mail_queue_dir():
+    from django.conf import settings
+    import tempfile
+
+    path = getattr(settings, 'EMAIL_QUEUE_DIR', None) or os.path.join(tempfile.gettempdir(), 'somase_mail_queue')
+    os.makedirs(os.path.join(path, 'failed'), exist_ok=True)
+    return path
+
+
+def _write_queue_entry(path, entry):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(entry, fh)
+    os.replace(tmp_path, path)
+
+
+def enqueue_email(subject, text_content, to, html_content=None, from_email=None, reply_to=None):
+    """
+    Spool an email for the background worker and return its queue id
+    """
+    from django.conf import settings
+
+    message_id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex}"
+    entry = {
+        'id': message_id,
+        'subject': subject,
+        'text': text_content,
+        'html': html_content,
+        'from_email': from_email or settings.DEFAULT_FROM_EMAIL,
+        'to': list(to),
+        'reply_to': list(reply_to) if reply_to else [settings.DEFAULT_FROM_EMAIL],
+        'attempts': 0,
+        'next_attempt': 0,
+    }
+    _write_queue_entry(os.path.join(_mail_queue_dir(), f"{message_id}.json"), entry)
+    logger.debug(f"Queued email {message_id} to {', '.join(entry['to'])}")
+
+    start_mail_worker()
+    _mail_queue_event.set()
+    return message_id
+
+
+def _build_queued_message(entry, connection=None):
+    from django.core.mail import EmailMultiAlternatives
+
+    email = EmailMultiAlternatives(
+        entry['subject'],
+        entry['text'],
+        entry['from_email'],
+        entry['to'],
+        reply_to=entry['reply_to'],
+        connection=connection
+    )
+    if entry.get('html'):
+        email.attach_alternative(entry['html'], "text/html")
+    return email
+
+
+def drain_mail_queue(max_messages=None):
+    """
+    Send every due message in the spool once. Failed sends are rescheduled
+    with exponential backoff and moved to failed/ after EMAIL_QUEUE_MAX_ATTEMPTS.
+    Returns the number of messages delivered.
+    """
+    from django.conf import settings
+
+    queue_dir = _mail_queue_dir()
+    max_attempts = getattr(settings, 'EMAIL_QUEUE_MAX_ATTEMPTS', 5)
+    backoff = getattr(settings, 'EMAIL_QUEUE_BACKOFF_SECONDS', 30)
+    now = time.time()
+    sent = 0
+
+    for name in sorted(os.listdir(queue_dir)):
+        if name.endswith('.json.sending'):
+            # Release claims left behind by a worker that died mid-send
+            # (claiming touches the file, so its mtime is the claim time)
+            stale = os.path.join(queue_dir, name)
+            try:
+                if now - os.path.getmtime(stale) > 600:
+                    os.rename(stale, stale[:-len('.sending')])
+            except OSError:
+                # Finished or reclaimed by another worker meanwhile
+                pass
+            continue
+        if not name.endswith('.json'):
+            continue
+        if max_messages is not None and sent >= max_messages:
+            break
+
+        path = os.path.join(queue_dir, name)
+        claimed = f"{path}.sending"
+        try:
+            # Renaming is atomic, so only one worker ever owns a message
+            os.rename(path, claimed)
+        except OSError:
+            continue
+        # rename() keeps the enqueue-time mtime; the stale check needs the claim time
+        os.utime(claimed)
+
+        with open(claimed, encoding='utf-8') as fh:
+            entry = json.load(fh)
+
+        if entry['next_attempt'] > now:
+            os.rename(claimed, path)
+            continue
+
+        try:
+            with span('smtp.send'):
+                _build_queued_message(entry, connection=get_mail_connection()).send(fail_silently=False)
+        except Exception as e:
+            entry['attempts'] += 1
+            entry['last_error'] = str(e)
+            if entry['attempts'] >= max_attempts:
+                logger.error(f"Giving up on email {entry['id']} after {entry['attempts']} attempts: {str(e)}")
+                _write_queue_entry(os.path.join(queue_dir, 'failed', name), entry)
+                os.remove(claimed)
+            else:
+                entry['next_attempt'] = now + backoff * (2 ** (entry['attempts'] - 1))
+                logger.warning(f"Email {entry['id']} failed (attempt {entry['attempts']}), retrying later: {str(e)}")
+                _write_queue_entry(path, entry)
+                os.remove(claimed)
+            continue
+
+        try:
+            os.remove(claimed)
+        except FileNotFoundError:
+            logger.warning(f"Claim on email {entry['id']} was released while it was being sent")
+        sent += 1
+        logger.info(f"Queued email {entry['id']} sent to {', '.join(entry['to'])}")
+
+    return sent
+
+
+def _mail_worker_loop():
+    from django.conf import settings
+
+    poll_interval = getattr(settings, 'EMAIL_QUEUE_POLL_SECONDS', 5)
+    while True:
+        # Drain first so mail spooled before a restart goes out at startup
+        try:
+            drain_mail_queue()
+        except Exception as e:
+            logger.error(f"Mail queue worker error: {str(e)}", exc_info=True)
+        _mail_queue_event.wait(poll_interval)
+        _mail_queue_event.clear()
+
+
+def start_mail_worker():
+    """
+    Start the in-process mail worker thread if it is not already running.
+    Call it from the app's AppConfig.ready() to drain the spool at startup;
+    otherwise the first request a process serves starts it.
+    """
+    global _mail_worker
+
+    with _mail_worker_lock:
+        if _mail_worker is None or not _mail_worker.is_alive():
+            _mail_worker = threading.Thread(target=_mail_worker_loop, name='mail-queue-worker', daemon=True)
+            _mail_worker.start()
+    return _mail_worker
+
+
+@receiver(request_started)
+def _start_mail_worker_on_request(sender, **kwargs):
+    # Spooled mail left by a previous run must not wait for this process's
+    # next enqueue_email()
+    if _mail_worker is None or not _mail_worker.is_alive():
+        start_mail_worker()
+
+
+# ---------------------------------------------------------------------------
+# Email templates
+#
+# Templates are compiled once at import: CSS is inlined into the markup and
+# the result is split into literal pieces and placeholder slots. Rendering
+# fills the slots with the per-recipient fields and joins the pieces, with
+# no regex pass over the document. string.Template is only the source
+# syntax.
+# ---------------------------------------------------------------------------
+
+def _inline_css(markup, css):
+    """
+    Inline `css` ({selector: declarations}) into style attributes.
+    Only tag selectors ('body') and single-class selectors ('.button') are
+    supported, which is all our email layouts use.
+    """
+    for selector, declarations in css.items():
+        declarations = ' '.join(declarations.split())
+        if selector.startswith('.'):
+            markup = re.sub(
+                rf'class="{re.escape(selector[1:])}"',
+                f'style="{declarations}"',
+                markup
+            )
+        else:
+            markup = re.sub(
+                rf'<{re.escape(selector)}(?=[\s>])',
+                f'<{selector} style="{declarations}"',
+                markup
+            )
+    return markup
+
+
+def _split_template(template):
+    """
+    Split a string.Template into literal pieces and placeholder slots once,
+    so rendering is a list copy and a join instead of a regex pass over the
+    whole document
+    """
+    text = template.template
+    pieces, slots = [], []
+    last = 0
+    for match in template.pattern.finditer(text):
+        pieces.append(text[last:match.start()])
+        name = match.group('named') or match.group('braced')
+        if name is not None:
+            slots.append((len(pieces), name))
+            pieces.append(None)
+        elif match.group('escaped') is not None:
+            pieces.append('$')
+        else:
+            raise ValueError(f"Invalid placeholder in email template: {text[match.start():match.start() + 20]!r}")
+        last = match.end()
+    pieces.append(text[last:])
+    return pieces, tuple(slots)
+
+
+def _fill(split, fields):
+    pieces, slots = split
+    pieces = list(pieces)
+    for index, name in slots:
+        pieces[index] = str(fields[name])
+    return ''.join(pieces)
+
+
+class EmailTemplate:
+    """
+    Precompiled subject/text/HTML triple rendered with $-placeholders
+    """
+
+    def __init__(self, subject, text, html=None, css=None):
+        self._compile(
+            Template(subject),
+            Template(text),
+            Template(_inline_css(html, css or {})) if html else None
+        )
+
+    def _compile(self, subject, text, html):
+        self.subject, self.text, self.html = subject, text, html
+        self._subject = _split_template(subject)
+        self._text = _split_template(text)
+        self._html = _split_template(html) if html is not None else None
+
+    def render(self, **fields):
+        """
+        Return (subject, text, html) for one recipient. Values are
+        HTML-escaped in the HTML part only.
+        """
+        html_content = None
+        if self._html is not None:
+            html_content = _fill(self._html, {key: html_escape(str(value)) for key, value in fields.items()})
+        return (
+            _fill(self._subject, fields),
+            _fill(self._text, fields),
+            html_content,
+        )
+
+    def partial(self, **fields):
+        """
+        Bind the fields shared by every recipient, leaving the rest as
+        placeholders; used by bulk sends so each message only fills in the
+        recipient-specific values.
+        """
+        # Bound values become part of the new template text, so escape any '$'
+        plain = {key: str(value).replace('$', '$$') for key, value in fields.items()}
+        escaped = {key: html_escape(str(value)).replace('$', '$$') for key, value in fields.items()}
+
+        bound = EmailTemplate.__new__(EmailTemplate)
+        bound._compile(
+            Template(self.subject.safe_substitute(plain)),
+            Template(self.text.safe_substitute(plain)),
+            Template(self.html.safe_substitute(escaped)) if self.html is not None else None
+        )
+        return bound
+
+
+EMAIL_BASE_CSS = {
+    'body': """
+        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+        line-height: 1.6;
+        color: #333;
+        background-color: #f9f9f9;
+        margin: 0;
+        padding: 0;
+    """,
+    '.container': """
+        max-width: 600px;
+        margin: 0 auto;
+        background-color: #ffffff;
+        padding: 20px;
+        border-radius: 8px;
+        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+    """,
+    '.header': """
+        text-align: center;
+        padding: 20px 0;
+        background-color: #1e4a76;
+        color: white;
+        border-radius: 8px 8px 0 0;
+    """,
+    '.content': """
+        padding: 20px;
+    """,
+    '.button': """
+        display: inline-block;
+        padding: 12px 24px;
+        background-color: #1e4a76;
+        color: white;
+        text-decoration: none;
+        border-radius: 4px;
+        margin: 20px 0;
+        font-weight: bold;
+    """,
+    '.footer': """
+        text-align: center;
+        padding: 20px;
+        font-size: 12px;
+        color: #666;
+    """,
+    '.verification-link': """
+        word-break: break-all;
+        color: #1e4a76;
+        font-weight: bold;
+    """,
+}
+
+ACTIVATION_EMAIL = EmailTemplate(
+    subject='Activate your MUBAS SOMASE Voting account',
+    text="""Hi ${username},
+
+Please click on the link below to confirm your registration for the SOMASE Voting System:
+
+${activation_url}
+
+If you didn't register for this account, please ignore this email.
+
+Thank you,
+MUBAS SOMASE Team""",
+    html="""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Email Verification</title>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>MUBAS SOMASE</h1>
+            <h2>Email Verification</h2>
+        </div>
+        <div class="content">
+            <h2>Hello ${username},</h2>
+            <p>Thank you for registering as a MUBAS SOMASE member. To complete your registration, please verify your email address by clicking the button below:</p>
+
+            <center>
+                <a href="${activation_url}" class="button">
+                    Verify Email Address
+                </a>
+            </center>
+
+            <p>Or copy and paste the following link into your browser:</p>
+            <p class="verification-link">${activation_url}</p>
+
+            <p>If you didn't request this registration, please ignore this email.</p>
+
+            <p>Best regards,<br>The MUBAS SOMASE Team</p>
+        </div>
+        <div class="footer">
+            <p>This is an automated message. Please do not reply to this email.</p>
+            <p>&copy; ${year} SOMASE Voting System. All rights reserved.</p>
+        </div>
+    </div>
+</body>
+</html>""",
+    css=EMAIL_BASE_CSS,
+)
+
+ELECTION_START_EMAIL = EmailTemplate(
+    subject='MUBAS SOMASE - Voting is now open',
+    text="""Hi ${username},
+
+${election_title} is now open. Log in to the SOMASE Voting System to cast your vote:
+
+${voting_url}
+
+Voting closes on ${end_date}.
+
+Thank you,
+MUBAS SOMASE Team""",
+)
+
+
+# ---------------------------------------------------------------------------
+# Background jobs
+#
+# Long-running admin work (bulk mail, large deletes) runs in a thread and
+# reports progress through the cache, so any worker can answer a status
+# poll for it.
+# ---------------------------------------------------------------------------
+
+BACKGROUND_JOB_TTL = 60 * 60 * 24
+
+
+def _background_job_key(job_id):
+    return f"background_job:{job_id}"
+
+
+def get_background_job(job_id):
+    from django.core.cache import cache
+
+    return cache.get(_background_job_key(job_id))
+
+
+class BackgroundJob:
+    """
+    Progress tracker for one background job, mirrored into the cache.
+    `counters` are the numeric fields update() increments.
+    """
+
+    def __init__(self, name, counters=('total',)):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.counters = tuple(counters)
+        self._lock = threading.Lock()
+        self.state = {
+            'job_id': self.id,
+            'name': name,
+            'status': 'queued',
+            'started_at': timezone.now().isoformat(),
+            'finished_at': None,
+        }
+        self.state.update({field: 0 for field in self.counters})
+        self._publish()
+
+    def _publish(self):
+        from django.core.cache import cache
+
+        cache.set(_background_job_key(self.id), dict(self.state), BACKGROUND_JOB_TTL)
+
+    def update(self, **changes):
+        with self._lock:
+            for field in self.counters:
+                self.state[field] += changes.pop(field, 0)
+            self.state.update(changes)
+            self._publish()
+
+    def run_in_background(self, target):
+        """
+        Run target(job) in a daemon thread, recording completion or failure
+        """
+        def run():
+            from django.db import connection as db_connection
+
+            self.update(status='running')
+            try:
+                target(self)
+                self.update(status='completed', finished_at=timezone.now().isoformat())
+            except Exception as e:
+                logger.error(f"Background job {self.name} ({self.id}) failed: {str(e)}", exc_info=True)
+                self.update(status='failed', error=str(e), finished_at=timezone.now().isoformat())
+            finally:
+                db_connection.close()
+
+        threading.Thread(target=run, name=f"job-{self.name}-{self.id}", daemon=True).start()
+        return self
+
+
+# ---------------------------------------------------------------------------
+# Chunked deletes
+#
+# Model.delete()/QuerySet.delete() go through Django's collector, which
+# loads every related row (and any row with delete signals attached) into
+# memory. chunked_delete walks the relation graph itself and removes rows a
+# chunk of primary keys at a time with plain DELETE/UPDATE statements.
+# Cascaded children are deleted first, each chunk of them in its own
+# transaction, so no transaction ever holds more than one chunk of one
+# table. Delete signals are not sent.
+# ---------------------------------------------------------------------------
+
+def _reverse_relations(model):
+    # Same candidate set Django's collector considers, including hidden
+    # many-to-many through tables
+    return [
+        field for field in model._meta.get_fields(include_hidden=True)
+        if field.auto_created and not field.concrete and (field.one_to_one or field.one_to_many)
+    ]
+
+
+def _delete_chunk(model, pks, using, chunk_size, on_chunk=None):
+    """
+    Delete rows `pks` of `model` and everything that cascades from them,
+    returning the number of rows deleted. `on_chunk(pks)` runs in the
+    transaction that deletes the rows themselves, before they are gone.
+    """
+    from django.db.models import CASCADE, DO_NOTHING, SET_NULL
+
+    relations = _reverse_relations(model)
+    rows = model._base_manager.using(using).filter(pk__in=pks)
+
+    if any(relation.on_delete not in (CASCADE, SET_NULL, DO_NOTHING) for relation in relations):
+        # PROTECT, RESTRICT, SET() and SET_DEFAULT need the collector's
+        # rules; apply them to this chunk only, before anything is removed
+        with span('db.chunked_delete'), transaction.atomic(using=using):
+            if on_chunk is not None:
+                on_chunk(pks)
+            return rows.delete()[0]
+
+    def related(relation):
+        return relation.related_model._base_manager.using(using).filter(**{f"{relation.field.name}__in": pks})
+
+    # Children first, a chunk per transaction; if the process dies here the
+    # parents are still in place and the delete can simply be run again
+    deleted = 0
+    for relation in relations:
+        if relation.on_delete is CASCADE:
+            deleted += chunked_delete(related(relation), chunk_size)
+
+    with span('db.chunked_delete'), transaction.atomic(using=using):
+        for relation in relations:
+            if relation.on_delete is CASCADE:
+                # Children inserted since the pass above
+                late = list(related(relation).values_list('pk', flat=True))
+                if late:
+                    deleted += _delete_chunk(relation.related_model, late, using, chunk_size)
+            elif relation.on_delete is SET_NULL:
+                related(relation).update(**{relation.field.name: None})
+        if on_chunk is not None:
+            on_chunk(pks)
+        deleted += rows._raw_delete(using)
+    return deleted
+
+
+def chunked_delete(queryset, chunk_size=None, job=None, on_chunk=None):
+    """
+    Delete everything matched by `queryset` (and its cascades) in chunks of
+    DELETE_CHUNK_SIZE primary keys. `on_chunk(pks)` runs inside the
+    transaction that deletes each chunk, while its rows can still be read,
+    e.g. to adjust tallies; `job` receives a 'deleted' count.
+    """
+    from django.conf import settings
+
+    chunk_size = chunk_size or getattr(settings, 'DELETE_CHUNK_SIZE', 1000)
+    model, using = queryset.model, queryset.db
+    total = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            break
+        deleted = _delete_chunk(model, pks, using, chunk_size, on_chunk)
+        total += deleted
+        if job is not None:
+            job.update(deleted=deleted)
+    return total
+
+
+def start_chunked_delete(name, queryset, on_chunk=None, on_done=None):
+    """
+    Run chunked_delete in the background and return its BackgroundJob.
+    `on_done()` runs once the delete has finished.
+    """
+    def run(job):
+        chunked_delete(queryset, job=job, on_chunk=on_chunk)
+        if on_done is not None:
+            on_done()
+
+    job = BackgroundJob(name, counters=('deleted',))
+    return job.run_in_background(run)
+
+
+def delete_user(user):
+    """
+    Remove a user and everything that cascades from them. Their votes are
+    deleted first, coming off the candidates' tallies as they go; cascading
+    them from the user would leave the tallies counting them.
+    """
+    Vote = _election_model('ELECTION_VOTE_MODEL', 'elections.Vote')
+
+    user_id = user.pk
+    chunked_delete(Vote._base_manager.filter(voter_id=user_id), on_chunk=release_vote_tallies)
+    chunked_delete(CustomUser._base_manager.filter(pk=user_id))
+    invalidate_auth_snapshot(user_id)
+
+
+def _election_model_label(setting, default):
+    from django.conf import settings
+
+    return getattr(settings, setting, default)
+
+
+def _election_model(setting, default):
+    from django.apps import apps
+
+    return apps.get_model(_election_model_label(setting, default))
+
+
+def release_vote_tallies(pks):
+    """
+    on_chunk for deleting votes: take votes `pks` off their candidates'
+    tallies, in the transaction that deletes them
+    """
+    from django.db.models import Count, F
+
+    Vote = _election_model('ELECTION_VOTE_MODEL', 'elections.Vote')
+    Candidate = _election_model('ELECTION_CANDIDATE_MODEL', 'elections.Candidate')
+
+    counts = Vote._base_manager.filter(pk__in=pks).values('candidate').annotate(removed=Count('pk'))
+    for row in counts:
+        Candidate._base_manager.filter(pk=row['candidate']).update(votes=F('votes') - row['removed'])
+    bump_version_token(RESULTS_VERSION_KEY)
+
+
+def _discard_current_results_snapshot():
+    from django.core.cache import cache
+
+    current = cache.get(RESULTS_SNAPSHOT_CURRENT_KEY)
+    if current is not None:
+        discard_results_snapshot(current['election_id'])
+
+
+def start_vote_reset():
+    """
+    Delete every vote in the background. Each chunk's votes come off their
+    candidates' tallies in the transaction that deletes them, so the counts
+    always match the votes still stored.
+    """
+    Vote = _election_model('ELECTION_VOTE_MODEL', 'elections.Vote')
+
+    _discard_current_results_snapshot()
+    return start_chunked_delete(
+        'reset_votes',
+        Vote._base_manager.all(),
+        on_chunk=release_vote_tallies,
+        on_done=lambda: publish_election_event('results', {'reset': True})
+    )
+
+
+def start_candidate_delete():
+    """
+    Delete every candidate application (and its votes) in the background
+    """
+    Candidate = _election_model('ELECTION_CANDIDATE_MODEL', 'elections.Candidate')
+
+    _discard_current_results_snapshot()
+    def done():
+        # Raw deletes send no signals
+        bump_version_token(CANDIDATES_VERSION_KEY)
+        publish_election_event('results', {'reset': True})
+
+    return start_chunked_delete('delete_all_candidates', Candidate._base_manager.all(), on_done=done)
+
+
+# ---------------------------------------------------------------------------
+# Bulk notifications
+#
+# Recipients are streamed from the database in chunks, each chunk is sent as
+# one send_messages() batch over a single pooled connection, and batches run
+# on a bounded thread pool. Progress is reported through a BackgroundJob.
+# ---------------------------------------------------------------------------
+
+def _send_bulk_batch(job, batch, template, from_email):
+    from django.core.mail import EmailMultiAlternatives
+
+    connection = get_mail_connection()
+    messages = []
+    for email_address, username in batch:
+        subject, text_content, html_content = template.render(username=username)
+        message = EmailMultiAlternatives(
+            subject,
+            text_content,
+            from_email,
+            [email_address],
+            connection=connection
+        )
+        if html_content is not None:
+            message.attach_alternative(html_content, "text/html")
+        messages.append(message)
+
+    # The connection is opened once for the whole batch; send_messages()
+    # leaves an already open connection open. One message per call, so a
+    # refused recipient only fails its own message and the counts match
+    # what was delivered.
+    sent = failed = 0
+    try:
+        with span('smtp.bulk_batch'):
+            connection.open()
+            for index, message in enumerate(messages):
+                try:
+                    if connection.send_messages([message]):
+                        sent += 1
+                    else:
+                        failed += 1
+                except smtplib.SMTPRecipientsRefused as e:
+                    logger.warning(f"Bulk email to {message.to[0]} refused for job {job.id}: {str(e)}")
+                    failed += 1
+                except Exception as e:
+                    logger.error(f"Bulk email to {message.to[0]} failed for job {job.id}: {str(e)}")
+                    failed += 1
+                    # The session may be dead; swap it for a fresh one
+                    connection.close()
+                    if index + 1 < len(messages):
+                        connection.open()
+    except Exception as e:
+        # Could not (re)open a connection: the rest of the batch is lost
+        logger.error(f"Bulk email batch for job {job.id} aborted: {str(e)}")
+        failed = len(messages) - sent
+    finally:
+        connection.close()
+    job.update(sent=sent, failed=failed)
+
+
+def send_bulk_email(name, recipients, template, context=None, batch_size=None, max_workers=None):
+    """
+    Send `template` (an EmailTemplate) to every (email, username) row of
+    `recipients` (a values_list queryset) in a background thread and return
+    the job. `context` is bound once up front so each recipient only fills
+    in ${username}.
+    """
+    from django.conf import settings
+
+    batch_size = batch_size or getattr(settings, 'BULK_EMAIL_BATCH_SIZE', 100)
+    max_workers = max_workers or getattr(settings, 'BULK_EMAIL_WORKERS', 4)
+    template = template.partial(**(context or {}))
+    from_email = settings.DEFAULT_FROM_EMAIL
+    job = BackgroundJob(name, counters=('total', 'sent', 'failed'))
+
+    def run(job):
+        from concurrent.futures import ThreadPoolExecutor
+
+        # Bound the number of batches held in memory to what the pool can work on
+        in_flight = threading.BoundedSemaphore(max_workers * 2)
+
+        def worker(batch):
+            try:
+                _send_bulk_batch(job, batch, template, from_email)
+            finally:
+                in_flight.release()
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bulk-email') as executor:
+            batch = []
+            for row in recipients.iterator(chunk_size=batch_size):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    in_flight.acquire()
+                    job.update(total=len(batch))
+                    executor.submit(worker, batch)
+                    batch = []
+            if batch:
+                in_flight.acquire()
+                job.update(total=len(batch))
+                executor.submit(worker, batch)
+
+    return job.run_in_background(run)
+
+
+# ---------------------------------------------------------------------------
+# Profile photo pipeline
+#
+# Uploads are spooled to PROFILE_PHOTO_SPOOL_DIR during the request and
+# processed by a small background pool: resize/recompress, push to the
+# configured image store, then point the user's profile_photo at the result.
+# Failed uploads go back to the spool with their attempt count in the file
+# name and are retried with exponential backoff by a periodic pass, which
+# also picks up spool files that survived a restart; after
+# PROFILE_PHOTO_MAX_ATTEMPTS they are moved to failed/.
+# ---------------------------------------------------------------------------
+
+class CloudinaryImageStore:
+    """
+    Stores images in Cloudinary and returns their secure URL
+    """
+
+    def __init__(self, folder='voting_app/profiles/'):
+        self.folder = folder
+
+    def store(self, path, name):
+        upload_result = cloudinary.uploader.upload(
+            path,
+            folder=self.folder,
+            public_id=name,
+            resource_type='image',
+            timeout=30
+        )
+        return upload_result['secure_url']
+
+
+class LocalImageStore:
+    """
+    Stores images on the local filesystem under MEDIA_ROOT; used in tests
+    and development
+    """
+
+    def __init__(self, folder='profiles'):
+        from django.conf import settings
+
+        self.root = os.path.join(settings.MEDIA_ROOT, folder)
+        self.base_url = f"{settings.MEDIA_URL.rstrip('/')}/{folder}"
+
+    def store(self, path, name):
+        import shutil
+
+        os.makedirs(self.root, exist_ok=True)
+        # Spooled originals carry .upload/.processing after their real extension
+        base = path
+        for suffix in ('.processing', '.upload'):
+            if base.endswith(suffix):
+                base = base[:-len(suffix)]
+        filename = f"{name}{os.path.splitext(base)[1]}"
+        shutil.copyfile(path, os.path.join(self.root, filename))
+        return f"{self.base_url}/{filename}"
+
+
+IMAGE_STORES = {
+    'cloudinary': CloudinaryImageStore,
+    'local': LocalImageStore,
+}
+
+
+def get_image_store():
+    from django.conf import settings
+
+    return IMAGE_STORES[getattr(settings, 'PROFILE_PHOTO_STORE', 'cloudinary')]()
+
+
+_photo_executor = None
+_photo_executor_lock = threading.Lock()
+_photo_retry_worker = None
+
+
+def _photo_spool_dir():
+    from django.conf import settings
+    import tempfile
+
+    path = getattr(settings, 'PROFILE_PHOTO_SPOOL_DIR', None) or os.path.join(tempfile.gettempdir(), 'somase_photo_spool')
+    os.makedirs(os.path.join(path, 'failed'), exist_ok=True)
+    return path
+
+
+def _parse_spool_name(path):
+    """
+    Split a spool file name ({user_id}-{attempts}-{uuid}{ext}.upload) into
+    (user_id, attempts, rest). Names spooled before attempts were tracked
+    have no attempts field and count as 0.
+    """
+    parts = os.path.basename(path).split('-', 2)
+    if len(parts) == 2:
+        return parts[0], 0, parts[1]
+    return parts[0], int(parts[1]), parts[2]
+
+
+def _optimize_image(path):
+    """
+    Downscale and recompress an image, returning the path of the optimized
+    copy. Falls back to the original file when Pillow is unavailable or the
+    image cannot be decoded.
+    """
+    from django.conf import settings
+
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return path
+
+    max_size = getattr(settings, 'PROFILE_PHOTO_MAX_SIZE', 512)
+    image_format = getattr(settings, 'PROFILE_PHOTO_FORMAT', 'WEBP')
+    quality = getattr(settings, 'PROFILE_PHOTO_QUALITY', 80)
+    output_path = f"{os.path.splitext(path)[0]}.{image_format.lower()}"
+
+    try:
+        with Image.open(path) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_size, max_size))
+            if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            image.save(output_path, image_format, quality=quality, optimize=True)
+    except Exception as e:
+        logger.warning(f"Could not optimize profile photo {path}, uploading original: {str(e)}")
+        return path
+    return output_path
+
+
+def _process_profile_photo(path):
+    """
+    Optimize and store one claimed spool file, then update its user
+    """
+    from django.conf import settings
+
+    user_id, attempts, rest = _parse_spool_name(path)
+    optimized = path
+    try:
+        with span('photo.optimize'):
+            optimized = _optimize_image(path)
+        with span('photo.store'):
+            url = get_image_store().store(optimized, f"user_{user_id}_{uuid.uuid4().hex[:8]}")
+        CustomUser.objects.filter(pk=user_id).update(profile_photo=url)
+        invalidate_auth_snapshot(user_id)
+        logger.info(f"Profile photo uploaded successfully: {url}")
+    except Exception as e:
+        attempts += 1
+        max_attempts = getattr(settings, 'PROFILE_PHOTO_MAX_ATTEMPTS', 5)
+        spool_dir = _photo_spool_dir()
+        released = os.path.join(spool_dir, f"{user_id}-{attempts}-{rest[:-len('.processing')]}")
+        if attempts >= max_attempts:
+            logger.error(f"Giving up on profile photo for user {user_id} after {attempts} attempts: {str(e)}", exc_info=True)
+            released = os.path.join(spool_dir, 'failed', os.path.basename(released))
+        else:
+            logger.warning(f"Profile photo upload for user {user_id} failed (attempt {attempts}), retrying later: {str(e)}")
+        try:
+            os.rename(path, released)
+            # The mtime of a released file is its failure time, which the
+            # backoff in resume_profile_photo_uploads counts from
+            os.utime(released)
+        except OSError:
+            logger.warning(f"Claim on profile photo {path} was released while it was being processed")
+        return
+    finally:
+        if optimized != path and os.path.exists(optimized):
+            os.remove(optimized)
+        from django.db import connection as db_connection
+        db_connection.close()
+    os.remove(path)
+
+
+def _submit_spooled_photo(path):
+    claimed = f"{path}.processing"
+    try:
+        os.rename(path, claimed)
+    except OSError:
+        return
+    # rename() keeps the spool-time mtime; the stale check needs the claim time
+    os.utime(claimed)
+    _photo_executor.submit(_process_profile_photo, claimed)
+
+
+def _get_photo_executor():
+    from django.conf import settings
+    from concurrent.futures import ThreadPoolExecutor
+
+    global _photo_executor, _photo_retry_worker
+
+    with _photo_executor_lock:
+        if _photo_executor is None:
+            _photo_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'PROFILE_PHOTO_WORKERS', 2),
+                thread_name_prefix='profile-photo'
+            )
+            _photo_retry_worker = threading.Thread(target=_photo_retry_loop, name='profile-photo-retry', daemon=True)
+            _photo_retry_worker.start()
+    return _photo_executor
+
+
+def _photo_retry_loop():
+    from django.conf import settings
+
+    poll_interval = getattr(settings, 'PROFILE_PHOTO_RETRY_POLL_SECONDS', 60)
+    while True:
+        # First pass right away so spool files from a previous run resume
+        try:
+            resume_profile_photo_uploads()
+        except Exception as e:
+            logger.error(f"Profile photo retry error: {str(e)}", exc_info=True)
+        time.sleep(poll_interval)
+
+
+def resume_profile_photo_uploads():
+    """
+    Requeue spool files that are due: failed uploads whose backoff has
+    elapsed and claims left behind by an interrupted worker
+    """
+    from django.conf import settings
+
+    backoff = getattr(settings, 'PROFILE_PHOTO_BACKOFF_SECONDS', 60)
+    spool_dir = _photo_spool_dir()
+    now = time.time()
+    for name in os.listdir(spool_dir):
+        path = os.path.join(spool_dir, name)
+        try:
+            if name.endswith('.processing'):
+                # Claiming touches the file, so its mtime is the claim time
+                if now - os.path.getmtime(path) <= 600:
+                    continue
+                os.rename(path, path[:-len('.processing')])
+                path = path[:-len('.processing')]
+            elif not name.endswith('.upload'):
+                continue
+            else:
+                attempts = _parse_spool_name(path)[1]
+                if attempts and now - os.path.getmtime(path) < backoff * (2 ** (attempts - 1)):
+                    continue
+        except OSError:
+            # Claimed or finished by another worker meanwhile
+            continue
+        _submit_spooled_photo(path)
+
+
+@receiver(request_started)
+def _resume_photo_uploads_on_request(sender, **kwargs):
+    # Starts the retry pass, so photos spooled before a restart do not wait
+    # for this process's first upload
+    if _photo_executor is None:
+        _get_photo_executor()
+
+
+def schedule_profile_photo(user_id, uploaded_file):
+    """
+    Spool an uploaded photo to disk and queue it for background processing
+    """
+    extension = os.path.splitext(uploaded_file.name)[1].lower() or '.img'
+    path = os.path.join(_photo_spool_dir(), f"{user_id}-0-{uuid.uuid4().hex}{extension}.upload")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as fh:
+        for chunk in uploaded_file.chunks():
+            fh.write(chunk)
+    os.replace(tmp_path, path)
+
+    _get_photo_executor()
+    _submit_spooled_photo(path)
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Auth snapshot cache
+#
+# /api/auth/check/ is hit on every dashboard mount. A compact snapshot of
+# the logged-in user is cached per user id so the check is answered from
+# the session and cache alone. Snapshots are dropped on logout, deletion and
+# any save of the user row (role changes, activation...).
+#
+# Writes that change a snapshot field without saving the user row do not
+# fire post_save: QuerySet.update() and raw SQL. The ballot commit behind
+# /api/bulk-vote/ is one of them whenever it flips has_voted with update()
+# or derives it from Vote rows, so it must call
+# invalidate_auth_snapshot_on_commit(request.user.pk) inside its
+# transaction.atomic() block; otherwise the dashboard keeps showing the
+# voting screen for up to AUTH_SNAPSHOT_TTL after the vote.
+# ---------------------------------------------------------------------------
+
+AUTH_SNAPSHOT_TTL = 60 * 5
+
+
+def _auth_snapshot_key(user_id):
+    return f"auth_snapshot:{user_id}"
+
+
+def build_auth_snapshot(user):
+    """
+    Only the fields the frontend reads: role (Login, ElectionsDashboard),
+    has_voted, username, email and profile_photo (MUBASVotingDashboard),
+    plus id and the account state. Anything else the previous
+    /api/auth/check/ returned is not part of the payload.
+    """
+    return {
+        'id': user.pk,
+        'username': user.username,
+        'email': user.email,
+        'role': getattr(user, 'role', None),
+        'is_active': user.is_active,
+        'is_email_verified': getattr(user, 'is_email_verified', False),
+        'has_voted': bool(getattr(user, 'has_voted', False)),
+        'profile_photo': str(user.profile_photo) if getattr(user, 'profile_photo', None) else None,
+    }
+
+
+def invalidate_auth_snapshot(user_id):
+    from django.core.cache import cache
+
+    cache.delete(_auth_snapshot_key(user_id))
+
+
+def invalidate_auth_snapshot_on_commit(user_id):
+    """
+    Drop the snapshot once the current transaction commits, so a check
+    racing the commit cannot re-cache the pre-commit row. Outside a
+    transaction the snapshot is dropped immediately.
+    """
+    transaction.on_commit(lambda: invalidate_auth_snapshot(user_id))
+
+
+def get_auth_snapshot(request):
+    """
+    Snapshot for the session's user, or None when not logged in. On a cache
+    hit only the session is read; the user row is loaded on a miss.
+    """
+    from django.contrib.auth import HASH_SESSION_KEY, SESSION_KEY, get_user
+    from django.core.cache import cache
+
+    request = getattr(request, '_request', request)
+    user_id = request.session.get(SESSION_KEY)
+    if user_id is None:
+        return None
+
+    key = _auth_snapshot_key(user_id)
+    cached = cache.get(key)
+    # The session hash changes with the password; a mismatch means this
+    # session was invalidated and must go through the full user load
+    if cached is not None and cached['session_hash'] == request.session.get(HASH_SESSION_KEY):
+        return cached['user']
+
+    # Not request.user: auth_check runs with no DRF authenticators, which
+    # leaves request.user as AnonymousUser. get_user() loads the user from
+    # the session and verifies its hash itself.
+    user = get_user(request)
+    if not user.is_authenticated:
+        return None
+    snapshot = build_auth_snapshot(user)
+    cache.set(key, {'user': snapshot, 'session_hash': user.get_session_auth_hash()}, AUTH_SNAPSHOT_TTL)
+    return snapshot
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def _drop_auth_snapshot_on_change(sender, instance, **kwargs):
+    invalidate_auth_snapshot_on_commit(instance.pk)
+
+
+@receiver(user_logged_out)
+def _drop_auth_snapshot_on_logout(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_auth_snapshot(user.pk)
+
+
+# ---------------------------------------------------------------------------
+# Final results snapshot
+#
+# Tallies cannot change once an election has closed, so they are computed
+# once by finalize_election_results() and written to RESULTS_SNAPSHOT_DIR as
+# gzipped JSON plus a gzipped CSV export. From then on results are served
+# from that file (kept in memory per process) with no database queries.
+# Every finalize writes a new generation under its own snapshot id, so a
+# snapshot discarded after a vote reset is replaced rather than reused.
+# Workers finalizing the same election at once agree on one generation
+# through a per-election cache.add(); each loser removes only its own files.
+# /api/results/ revalidates by ETag; only the versioned
+# /api/results/<snapshot_id>/final/ URL is cacheable for good.
+# ---------------------------------------------------------------------------
+
+RESULTS_SNAPSHOT_MAX_AGE = 60 * 60 * 24 * 365
+RESULTS_SNAPSHOT_CURRENT_KEY = 'results_snapshot:current'
+
+
+def _results_snapshot_key(election_id):
+    return f"results_snapshot:{election_id}"
+
+_results_snapshots = {}
+_results_snapshots_lock = threading.Lock()
+
+
+def _results_snapshot_dir():
+    from django.conf import settings
+    import tempfile
+
+    path = getattr(settings, 'RESULTS_SNAPSHOT_DIR', None) or os.path.join(tempfile.gettempdir(), 'somase_results')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _results_snapshot_paths(snapshot_id):
+    base = os.path.join(_results_snapshot_dir(), snapshot_id)
+    return f"{base}.json.gz", f"{base}.csv.gz"
+
+
+def _remove_results_snapshots(election_id):
+    prefix = f"{election_id}-"
+    for name in os.listdir(_results_snapshot_dir()):
+        if name.startswith(prefix):
+            try:
+                os.remove(os.path.join(_results_snapshot_dir(), name))
+            except FileNotFoundError:
+                pass
+
+
+def _build_results_snapshot(election_id, candidates, ballots_cast, eligible_voters):
+    from django.utils import timezone
+
+    candidates = sorted(
+        ({
+            'id': c['id'],
+            'full_name': c['full_name'],
+            'position': c['position'],
+            'position_display': c.get('position_display') or c['position'],
+            'votes': c.get('votes') or 0,
+        } for c in candidates),
+        key=lambda c: (c['position'], -c['votes'], c['full_name'])
+    )
+
+    positions = {}
+    for candidate in candidates:
+        position = positions.setdefault(candidate['position'], {
+            'position_display': candidate['position_display'],
+            'total_votes': 0,
+            'winners': [],
+            'top_votes': 0,
+        })
+        position['total_votes'] += candidate['votes']
+        if candidate['votes'] > position['top_votes']:
+            position['top_votes'], position['winners'] = candidate['votes'], [candidate['id']]
+        elif candidate['votes'] and candidate['votes'] == position['top_votes']:
+            position['winners'].append(candidate['id'])
+    for position in positions.values():
+        position['turnout'] = round(position['total_votes'] / eligible_voters, 4) if eligible_voters else None
+
+    return {
+        'election_id': election_id,
+        'final': True,
+        'finalized_at': timezone.now().isoformat(),
+        # Same keys as the live /api/results/ payload
+        'totalVotes': sum(c['votes'] for c in candidates),
+        'candidates': candidates,
+        'ballots_cast': ballots_cast,
+        'eligible_voters': eligible_voters,
+        'turnout': round(ballots_cast / eligible_voters, 4) if eligible_voters else None,
+        'positions': positions,
+    }
+
+
+def _results_snapshot_csv(snapshot):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['position', 'candidate_id', 'candidate', 'votes', 'share', 'winner'])
+    for candidate in snapshot['candidates']:
+        position = snapshot['positions'][candidate['position']]
+        share = candidate['votes'] / position['total_votes'] if position['total_votes'] else 0
+        writer.writerow([
+            position['position_display'],
+            candidate['id'],
+            candidate['full_name'],
+            candidate['votes'],
+            f"{share:.4f}",
+            'yes' if candidate['id'] in position['winners'] else '',
+        ])
+    return buffer.getvalue().encode('utf-8')
+
+
+def _write_results_file(path, content):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as fh:
+        fh.write(content)
+    os.replace(tmp_path, path)
+
+
+def finalize_election_results(election_id, candidates, ballots_cast, eligible_voters=None):
+    """
+    Freeze the results of a closed election. `candidates` are dicts with id,
+    full_name, position, position_display and votes. Safe to call from
+    several workers at once: the first to claim the election's cache key
+    publishes its snapshot and the others return that one. Returns the
+    snapshot as served to clients.
+    """
+    from django.core.cache import cache
+
+    claimed = cache.get(_results_snapshot_key(election_id))
+    if claimed is not None:
+        existing = get_results_snapshot(claimed['snapshot_id'])
+        if existing is not None:
+            return existing[0]
+
+    snapshot_id = f"{election_id}-{uuid.uuid4().hex[:12]}"
+    json_path, csv_path = _results_snapshot_paths(snapshot_id)
+    with span('results.finalize'):
+        snapshot = _build_results_snapshot(election_id, candidates, ballots_cast, eligible_voters)
+        snapshot['snapshot_id'] = snapshot_id
+        _write_results_file(csv_path, gzip.compress(_results_snapshot_csv(snapshot)))
+        _write_results_file(json_path, gzip.compress(json.dumps(snapshot).encode('utf-8')))
+
+    pointer = {'election_id': election_id, 'snapshot_id': snapshot_id}
+    if claimed is not None:
+        # The claimed generation's files are gone (a reset racing us, or
+        # a snapshot dir that is not shared); this one replaces it
+        cache.set(_results_snapshot_key(election_id), pointer, None)
+    elif not cache.add(_results_snapshot_key(election_id), pointer, None):
+        # Another worker finalized first; serve its snapshot
+        os.remove(json_path)
+        os.remove(csv_path)
+        winner = get_results_snapshot(cache.get(_results_snapshot_key(election_id), pointer)['snapshot_id'])
+        return winner[0] if winner is not None else snapshot
+
+    cache.set(RESULTS_SNAPSHOT_CURRENT_KEY, pointer, None)
+    logger.info(f"Finalized results for election {election_id} as {snapshot_id}")
+    publish_election_event('results', {'final': True, 'snapshot_id': snapshot_id})
+    return snapshot
+
+
+def get_results_snapshot(snapshot_id):
+    """
+    (snapshot, body, etag) for a snapshot id, or None
+    """
+    with _results_snapshots_lock:
+        cached = _results_snapshots.get(snapshot_id)
+    if cached is not None:
+        return cached
+
+    json_path, _ = _results_snapshot_paths(snapshot_id)
+    try:
+        with open(json_path, 'rb') as fh:
+            body = gzip.decompress(fh.read())
+    except FileNotFoundError:
+        return None
+
+    cached = (json.loads(body), body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+    with _results_snapshots_lock:
+        _results_snapshots[snapshot_id] = cached
+    return cached
+
+
+def current_results_snapshot():
+    """
+    Snapshot of the most recently finalized election, or None while an
+    election is open. One cache read, no database queries.
+    """
+    from django.core.cache import cache
+
+    current = cache.get(RESULTS_SNAPSHOT_CURRENT_KEY)
+    if current is None:
+        return None
+    return get_results_snapshot(current['snapshot_id'])
+
+
+def discard_results_snapshot(election_id):
+    """
+    Go back to live results and delete the election's snapshots. Call it
+    when votes are reset or a new election starts; the next finalize then
+    writes a fresh generation.
+    """
+    from django.core.cache import cache
+
+    current = cache.get(RESULTS_SNAPSHOT_CURRENT_KEY)
+    if current is not None and current['election_id'] == election_id:
+        cache.delete(RESULTS_SNAPSHOT_CURRENT_KEY)
+    cache.delete(_results_snapshot_key(election_id))
+    _remove_results_snapshots(election_id)
+    with _results_snapshots_lock:
+        for snapshot_id in [key for key in _results_snapshots if key.startswith(f"{election_id}-")]:
+            del _results_snapshots[snapshot_id]
+
+
+def results_snapshot_response(request, snapshot):
+    """
+    Serve a (payload, body, etag) triple on /api/results/: the current
+    snapshot or the live tally. The URL is shared by every election, so
+    clients revalidate by ETag on each request.
+
+    If-None-Match is not CORS-safelisted: the dashboard's conditional polls
+    are preflighted, so CORS_ALLOW_HEADERS must include 'if-none-match'.
+    ETag is exposed here so the cross-origin fetch can read it.
+    """
+    from django.http import HttpResponse, HttpResponseNotModified
+
+    _, body, etag = snapshot
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    response['Access-Control-Expose-Headers'] = 'ETag'
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Candidates
+#
+# Everything derived from the candidate table is cached under a version
+# token in the shared cache. Saving or deleting a candidate (a status
+# change, an edited application) replaces the token once the transaction
+# commits, so every worker drops its copies on its next read. Bulk updates
+# of the vote counters send no signals and leave the token alone.
+#
+# The candidate lists are one projected query each, serialized once per
+# version and position filter and kept in the shared cache with a strong
+# ETag, so an unchanged list revalidates as an empty 304.
+# ---------------------------------------------------------------------------
+
+CANDIDATES_VERSION_KEY = 'election_candidates:version'
+CANDIDATE_LIST_TTL = 60 * 60
+
+# Fields each list serves, on top of position_display
+CANDIDATE_LIST_FIELDS = {
+    # MUBASVotingDashboard
+    'ballot': ('id', 'full_name', 'position', 'slogan', 'profile_photo'),
+    # The admin applications table and its detail modal
+    'applications': (
+        'id', 'full_name', 'email', 'phone', 'position', 'slogan', 'manifesto',
+        'profile_photo', 'status', 'created_at',
+    ),
+}
+CANDIDATE_STATUSES = ('pending', 'approved', 'rejected')
+
+_candidate_positions = {}
+_candidate_positions_lock = threading.Lock()
+
+
+def version_token(key):
+    """
+    Version token stored under `key` in the shared cache, created on first use
+    """
+    from django.core.cache import cache
+
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex[:12], None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version_token(key):
+    """
+    Replace the token under `key` once the current transaction commits, so
+    nothing rebuilt before the commit is cached under the new token
+    """
+    from django.core.cache import cache
+
+    # A fresh random token rather than incr(): after an eviction a counter
+    # would start over and could hit a version some process still holds
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex[:12], None))
+
+
+@receiver(post_save, sender=_election_model_label('ELECTION_CANDIDATE_MODEL', 'elections.Candidate'))
+@receiver(post_delete, sender=_election_model_label('ELECTION_CANDIDATE_MODEL', 'elections.Candidate'))
+def _bump_candidates_version_on_change(sender, instance, **kwargs):
+    bump_version_token(CANDIDATES_VERSION_KEY)
+
+
+def candidate_positions():
+    """
+    {candidate id: position} for every approved candidate. Held in process
+    memory per candidates version token, so a ballot is validated without
+    touching the candidate table.
+    """
+    version = version_token(CANDIDATES_VERSION_KEY)
+    with _candidate_positions_lock:
+        cached = _candidate_positions.get(version)
+    if cached is not None:
+        return cached
+
+    Candidate = _election_model('ELECTION_CANDIDATE_MODEL', 'elections.Candidate')
+    with span('db.candidate_positions'):
+        positions = dict(Candidate._base_manager.filter(status='approved').values_list('pk', 'position'))
+    with _candidate_positions_lock:
+        _candidate_positions.clear()
+        _candidate_positions[version] = positions
+    return positions
+
+
+def _serialize_candidate(candidate, fields):
+    row = {field: getattr(candidate, field) for field in fields}
+    row['position_display'] = candidate.get_position_display()
+    if 'profile_photo' in row:
+        row['profile_photo'] = str(row['profile_photo']) if row['profile_photo'] else None
+    if 'created_at' in row:
+        row['created_at'] = row['created_at'].isoformat()
+    return row
+
+
+def candidate_list(scope, position=None):
+    """
+    (body, etag) of the 'ballot' list (approved candidates) or the
+    'applications' list (every application, with the applicant's
+    username), optionally for one position
+    """
+    from django.core.cache import cache
+
+    key = f"election_candidates:{version_token(CANDIDATES_VERSION_KEY)}:{scope}:{position or ''}"
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    Candidate = _election_model('ELECTION_CANDIDATE_MODEL', 'elections.Candidate')
+    fields = CANDIDATE_LIST_FIELDS[scope]
+    if scope == 'ballot':
+        rows = Candidate._base_manager.filter(status='approved').only(*fields).order_by('position', 'full_name')
+    else:
+        rows = (
+            Candidate._base_manager
+            .select_related('user')
+            .only(*fields, 'user__username')
+            .order_by('-created_at')
+        )
+    if position:
+        rows = rows.filter(position=position)
+
+    with span('db.candidate_list'):
+        candidates = []
+        for candidate in rows:
+            row = _serialize_candidate(candidate, fields)
+            if scope == 'applications':
+                row['username'] = candidate.user.username if candidate.user_id else None
+            candidates.append(row)
+
+    body = json.dumps(candidates).encode('utf-8')
+    cached = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+    cache.set(key, cached, CANDIDATE_LIST_TTL)
+    return cached
+
+
+def candidate_list_response(request, scope, cache_control):
+    """
+    Serve a candidate list, filtered by ?position=, as a 304 when the
+    browser's copy is current
+    """
+    from django.http import HttpResponse, HttpResponseNotModified
+
+    position = request.GET.get('position') or None
+    if position is not None and not re.fullmatch(r'[\w-]+', position):
+        return Response({'error': 'Unknown position'}, status=status.HTTP_400_BAD_REQUEST)
+
+    body, etag = candidate_list(scope, position)
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Live results
+#
+# Until an election is finalized /api/results/ serves the candidates' vote
+# counters. Ballots, resets and vote deletes keep them in step with the
+# Vote table inside their own transactions, so a poll reads one row per
+# candidate and never the votes. The serialized tally is held in process
+# memory under the results and candidates version tokens; anything that
+# moves a counter replaces the results token on commit. The ETag is made
+# from the two tokens, so an unchanged poll is a 304 after two cache reads.
+# ---------------------------------------------------------------------------
+
+RESULTS_VERSION_KEY = 'election_results:version'
+
+_live_results = {}
+_live_results_lock = threading.Lock()
+
+
+def tally_rows(lock=False):
+    """
+    id, full_name, position, position_display and votes of every approved
+    candidate. With `lock`, the rows are locked for the current transaction
+    and read only once in-flight ballots have committed.
+    """
+    Candidate = _election_model('ELECTION_CANDIDATE_MODEL', 'elections.Candidate')
+
+    rows = Candidate._base_manager.filter(status='approved')
+    if lock:
+        rows = rows.select_for_update()
+    position_names = dict(Candidate._meta.get_field('position').flatchoices)
+    # Locked in id order, like ballots lock them, so the two cannot deadlock
+    candidates = list(rows.order_by('pk').values('id', 'full_name', 'position', 'votes'))
+    for candidate in candidates:
+        candidate['position_display'] = position_names.get(candidate['position'], candidate['position'])
+    candidates.sort(key=lambda c: (c['position'], -c['votes'], c['full_name']))
+    return candidates
+
+
+def live_results():
+    """
+    (payload, body, etag) of the live tally, in the shape of
+    get_results_snapshot()
+    """
+    version = f"{version_token(RESULTS_VERSION_KEY)}-{version_token(CANDIDATES_VERSION_KEY)}"
+    with _live_results_lock:
+        cached = _live_results.get(version)
+    if cached is not None:
+        return cached
+
+    with span('db.live_results'):
+        candidates = tally_rows()
+
+    payload = {
+        'final': False,
+        'totalVotes': sum(candidate['votes'] for candidate in candidates),
+        'candidates': candidates,
+    }
+    cached = (payload, json.dumps(payload).encode('utf-8'), f'"live-{version}"')
+    with _live_results_lock:
+        _live_results.clear()
+        _live_results[version] = cached
+    return cached
+
+
+# ---------------------------------------------------------------------------
+# Ballots
+#
+# A voter's whole ballot arrives in one /api/bulk-vote/ request. It is
+# checked against candidate_positions(), then written in one transaction:
+# the voter row is locked with SELECT ... FOR UPDATE, every vote goes in
+# with a single bulk_create and the candidates' counters are bumped before
+# the voter is marked as having voted. Two submissions from one voter
+# queue on the lock and the second finds has_voted set. Vote needs
+#
+#     models.UniqueConstraint(fields=['voter', 'position'], name='one_vote_per_position')
+#
+# for backends without row locks (SQLite) and for writers that skip the
+# lock; the IntegrityError it raises is answered like a second ballot.
+#
+# Whether the election is open is read last, after the counters are locked.
+# close_election() flips the flag first and then locks the counters to
+# freeze them, so every ballot is either refused or in the final results.
+# ---------------------------------------------------------------------------
+
+BALLOT_EVENT_INTERVAL = 1
+
+
+def election_is_open():
+    """
+    True while the current election is active and inside its dates
+    """
+    from django.utils import timezone
+
+    ElectionSettings = _election_model('ELECTION_SETTINGS_MODEL', 'elections.ElectionSettings')
+    election = ElectionSettings._base_manager.order_by('-pk').first()
+    now = timezone.now()
+    return bool(
+        election is not None and election.is_active
+        and (election.start_date is None or election.start_date <= now)
+        and (election.end_date is None or now < election.end_date)
+    )
+
+
+def _ballot_conflict():
+    return Response(
+        {'error': 'Your ballot has already been recorded for this election.'},
+        status=status.HTTP_409_CONFLICT
+    )
+
+
+def _parse_ballot(data, positions):
+    """
+    {position: candidate id} for a ballot, or an error message
+    """
+    ballot = data.get('votes') if isinstance(data, dict) else None
+    if not isinstance(ballot, list) or not ballot:
+        return None, 'A ballot needs at least one vote'
+
+    choices = {}
+    for vote in ballot:
+        try:
+            position, candidate_id = vote['position'], int(vote['candidate_id'])
+        except (TypeError, KeyError, ValueError):
+            return None, 'Every vote needs a position and a candidate_id'
+        if positions.get(candidate_id) != position:
+            return None, f"Candidate {candidate_id} is not standing for {position}"
+        if position in choices:
+            return None, f"More than one vote for {position}"
+        choices[position] = candidate_id
+    return choices, None
+
+
+def _election_id(election):
+    # The settings row is reused from one election to the next; its start
+    # date tells them apart
+    started = int(election.start_date.timestamp()) if election.start_date else 0
+    return f"{election.pk}-{started}"
+
+
+def close_election():
+    """
+    Close the current election once its end date has passed and freeze its
+    results. Every admin dashboard polls for this at the deadline; a
+    conditional update lets exactly one of them do the closing. Returns
+    'active', 'inactive' or 'ended'.
+    """
+    from django.utils import timezone
+
+    ElectionSettings = _election_model('ELECTION_SETTINGS_MODEL', 'elections.ElectionSettings')
+    election = ElectionSettings._base_manager.order_by('-pk').first()
+    if election is None:
+        return 'inactive'
+    if election.end_date is None or timezone.now() < election.end_date:
+        return 'active' if election.is_active else 'inactive'
+    if not ElectionSettings._base_manager.filter(pk=election.pk, is_active=True).update(is_active=False):
+        # Closed by another request (or by hand) after the deadline
+        return 'ended'
+
+    with transaction.atomic():
+        # Waits for ballots that locked these rows before the flag flipped
+        candidates = tally_rows(lock=True)
+        ballots_cast = CustomUser.objects.filter(has_voted=True).count()
+    finalize_election_results(
+        _election_id(election),
+        candidates,
+        ballots_cast,
+        eligible_voters=CustomUser.objects.filter(is_active=True).count()
+    )
+    # After the snapshot, so dashboards reloading on it get the final results
+    publish_election_event('election_end')
+    return 'ended'
+
+
+def _publish_ballot_event():
+    from django.core.cache import cache
+
+    # At peak every second brings hundreds of ballots; one event a second
+    # is enough for the dashboards, which still poll in between
+    if cache.add('election_events:ballot_throttle', 1, BALLOT_EVENT_INTERVAL):
+        publish_election_event('results')
+
+
+def record_ballot(voter_id, choices):
+    """
+    Store a parsed ballot for `voter_id`. Returns 'recorded', 'duplicate'
+    if the voter already has a ballot or 'closed' outside the election.
+    """
+    from django.db.models import F
+
+    Vote = _election_model('ELECTION_VOTE_MODEL', 'elections.Vote')
+    Candidate = _election_model('ELECTION_CANDIDATE_MODEL', 'elections.Candidate')
+
+    try:
+        with span('db.ballot'), transaction.atomic():
+            voter = CustomUser.objects.select_for_update().only('pk', 'has_voted').get(pk=voter_id)
+            if voter.has_voted:
+                return 'duplicate'
+            Vote._base_manager.bulk_create([
+                Vote(voter_id=voter_id, candidate_id=candidate_id, position=position)
+                for position, candidate_id in choices.items()
+            ])
+            # In id order, so ballots sharing candidates lock their rows in
+            # the same order and cannot deadlock
+            for candidate_id in sorted(choices.values()):
+                Candidate._base_manager.filter(pk=candidate_id).update(votes=F('votes') + 1)
+            if not election_is_open():
+                transaction.set_rollback(True)
+                return 'closed'
+            CustomUser.objects.filter(pk=voter_id).update(has_voted=True)
+            bump_version_token(RESULTS_VERSION_KEY)
+            invalidate_auth_snapshot_on_commit(voter_id)
+            transaction.on_commit(_publish_ballot_event)
+    except IntegrityError:
+        # Only the unique constraint is expected here; anything else
+        # (a candidate deleted mid-ballot) is a real error
+        if not Vote._base_manager.filter(voter_id=voter_id).exists():
+            raise
+        return 'duplicate'
+    return 'recorded'
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting
+#
+# Limits keyed by client IP and by the email/username in the request. The
+# memory backend is an exact per-process token bucket (GCRA). The cache
+# backend is shared between workers and approximates a rolling window with
+# two fixed-window counters, so a hit is one cache.incr() and one get().
+# ---------------------------------------------------------------------------
+
+RATE_LIMIT_DEFAULTS = {
+    # scope: {key kind: (requests, period in seconds)}
+    'register': {'ip': (20, 60 * 60), 'identity': (5, 60 * 60)},
+    'email_test': {'ip': (5, 60 * 60)},
+}
+
+
+class MemoryRateLimitBackend:
+    """
+    In-process token bucket using the generic cell rate algorithm: one
+    timestamp per key, `limit` tokens of burst, refilled continuously
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tat = {}
+        self._hits = 0
+
+    def hit(self, key, limit, period):
+        interval = period / limit
+        now = time.monotonic()
+        with self._lock:
+            self._hits += 1
+            if self._hits % 1000 == 0:
+                self._tat = {k: tat for k, tat in self._tat.items() if tat > now}
+
+            tat = max(self._tat.get(key, now), now)
+            allow_at = tat + interval - period
+            if now < allow_at:
+                return False, allow_at - now
+            self._tat[key] = tat + interval
+            return True, 0
+
+
+class CacheRateLimitBackend:
+    """
+    Shared sliding-window counter in the Django cache. Hits are counted per
+    fixed window with one atomic incr; the previous window's count is
+    weighted by how much of it still overlaps the last `period` seconds, so
+    a burst straddling a window boundary cannot get twice the limit through.
+    """
+
+    def hit(self, key, limit, period):
+        from django.core.cache import cache
+
+        now = time.time()
+        window = int(now // period)
+        elapsed = (now - window * period) / period
+        cache_key = f"ratelimit:{key}:{window}"
+        try:
+            used = cache.incr(cache_key)
+        except ValueError:
+            # First hit in this window; kept for the next window's estimate
+            if cache.add(cache_key, 1, period * 2):
+                used = 1
+            else:
+                used = cache.incr(cache_key)
+        previous = cache.get(f"ratelimit:{key}:{window - 1}", 0)
+
+        if previous * (1 - elapsed) + used <= limit:
+            return True, 0
+        if used <= limit and previous:
+            # Wait until enough of the previous window has slid out
+            return False, max(1 - (limit - used) / previous - elapsed, 0) * period
+        return False, (window + 1) * period - now
+
+
+RATE_LIMIT_BACKENDS = {
+    'memory': MemoryRateLimitBackend,
+    'cache': CacheRateLimitBackend,
+}
+
+_rate_limit_backend = None
+_rate_limit_backend_lock = threading.Lock()
+
+
+def get_rate_limit_backend():
+    from django.conf import settings
+
+    global _rate_limit_backend
+
+    with _rate_limit_backend_lock:
+        if _rate_limit_backend is None:
+            _rate_limit_backend = RATE_LIMIT_BACKENDS[getattr(settings, 'RATE_LIMIT_BACKEND', 'cache')]()
+    return _rate_limit_backend
+
+
+def _client_ip(request):
+    """
+    Client address for rate limiting. X-Forwarded-For is client-controlled,
+    so it is only read behind RATE_LIMIT_TRUSTED_PROXIES proxies, each of
+    which appends the address it received the request from; the entry
+    added by the outermost one is the client.
+    """
+    from django.conf import settings
+
+    trusted_proxies = getattr(settings, 'RATE_LIMIT_TRUSTED_PROXIES', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if trusted_proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        if len(addresses) >= trusted_proxies:
+            return addresses[-trusted_proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _request_identities(request):
+    """
+    Email/username submitted with the request, lower-cased
+    """
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return []
+        if not isinstance(data, dict):
+            return []
+    else:
+        data = request.POST
+    return [
+        f"{field}:{str(data[field]).strip().lower()}"
+        for field in ('email', 'username')
+        if data.get(field)
+    ]
+
+
+def check_rate_limit(request, scope):
+    """
+    Take one token from every bucket that applies to this request. Returns
+    the seconds to wait when any bucket is empty, otherwise None.
+    """
+    from django.conf import settings
+
+    limits = getattr(settings, 'RATE_LIMITS', {}).get(scope) or RATE_LIMIT_DEFAULTS[scope]
+    keys = []
+    if 'ip' in limits:
+        keys.append(('ip', f"ip:{_client_ip(request)}"))
+    if 'identity' in limits:
+        keys.extend(('identity', identity) for identity in _request_identities(request))
+
+    backend = get_rate_limit_backend()
+    retry_after = None
+    for kind, key in keys:
+        limit, period = limits[kind]
+        allowed, wait = backend.hit(f"{scope}:{key}", limit, period)
+        if not allowed:
+            retry_after = max(retry_after or 0, wait)
+    return retry_after
+
+
+def _rate_limited_response(retry_after):
+    import math
+    from django.conf import settings
+    from django.http import JsonResponse
+
+    retry_after = max(1, math.ceil(retry_after))
+    response = JsonResponse({
+        'error': 'Too many requests. Please wait a while and try again.',
+        'error_type': 'rate_limited',
+        'retry_after': retry_after
+    }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(retry_after)
+    response['Access-Control-Allow-Origin'] = settings.FRONTEND_URL
+    response['Access-Control-Allow-Credentials'] = 'true'
+    response['Access-Control-Expose-Headers'] = 'Retry-After'
+    return response
+
+
+def rate_limit(scope):
+    """
+    Decorator applying the `scope` limits to a sync or async view.
+    CORS preflight requests are never limited.
+    """
+    from functools import wraps
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method != 'OPTIONS':
+                    # The cache backend makes blocking round trips; keep them
+                    # off the event loop. No DB access, so any thread will do.
+                    retry_after = await sync_to_async(check_rate_limit, thread_sensitive=False)(request, scope)
+                    if retry_after is not None:
+                        return _rate_limited_response(retry_after)
+                return await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'OPTIONS':
+                retry_after = check_rate_limit(request, scope)
+                if retry_after is not None:
+                    return _rate_limited_response(retry_after)
+            return view(request, *args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Email diagnostics
+#
+# A background prober checks SMTP reachability on a schedule, timing the
+# connect, STARTTLS and AUTH phases into latency histograms. The email test
+# endpoints answer from the last probe; a real test email is only sent when
+# the caller asks for it with ?send=true.
+# ---------------------------------------------------------------------------
+
+EMAIL_PROBE_CACHE_KEY = 'email_diagnostics:last_probe'
+EMAIL_PROBE_LOCK_KEY = 'email_diagnostics:probe_lock'
+
+
+def _smtp_error_kind(error):
+    """
+    Classify an smtplib or aiosmtplib error as connect/auth/smtp/unexpected
+    """
+    connect_errors = (smtplib.SMTPConnectError,)
+    auth_errors = (smtplib.SMTPAuthenticationError,)
+    smtp_errors = (smtplib.SMTPException,)
+    if aiosmtplib is not None:
+        connect_errors += (aiosmtplib.SMTPConnectError,)
+        auth_errors += (aiosmtplib.SMTPAuthenticationError,)
+        smtp_errors += (aiosmtplib.SMTPException,)
+
+    if isinstance(error, connect_errors):
+        return 'connect'
+    if isinstance(error, auth_errors):
+        return 'auth'
+    if isinstance(error, smtp_errors):
+        return 'smtp'
+    return 'unexpected'
+
+
+class EmailDiagnostics:
+    """
+    Scheduled SMTP prober; the latest result is shared through the cache
+    """
+
+    PHASES = ('connect', 'tls', 'auth')
+
+    def __init__(self, interval=300, timeout=15):
+        self.interval = interval
+        self.timeout = timeout
+        self.histograms = {phase: LatencyHistogram() for phase in self.PHASES}
+        self.last = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _timed(self, phase, result, func, *args):
+        start = time.perf_counter()
+        value = func(*args)
+        elapsed = time.perf_counter() - start
+        self.histograms[phase].observe(elapsed)
+        result['phases'][phase] = round(elapsed, 6)
+        return value
+
+    def probe(self):
+        """
+        Open a fresh SMTP session (not a pooled one) and time each phase
+        """
+        from django.conf import settings
+        from django.core.cache import cache
+
+        result = {
+            'smtp_connection': False,
+            'smtp_authentication': False,
+            'error_kind': None,
+            'error': None,
+            'checked_at': timezone.now().isoformat(),
+            'phases': {},
+        }
+        server = None
+        try:
+            server = self._timed('connect', result, smtplib.SMTP, settings.EMAIL_HOST, settings.EMAIL_PORT, None, self.timeout)
+            if settings.EMAIL_USE_TLS:
+                self._timed('tls', result, server.starttls)
+            result['smtp_connection'] = True
+            self._timed('auth', result, server.login, settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
+            result['smtp_authentication'] = True
+        except Exception as e:
+            result['error_kind'] = _smtp_error_kind(e)
+            result['error'] = str(e)
+            logger.warning(f"SMTP probe failed: {str(e)}")
+        finally:
+            if server is not None:
+                try:
+                    server.quit()
+                except Exception:
+                    server.close()
+
+        self.last = result
+        cache.set(EMAIL_PROBE_CACHE_KEY, result, self.interval * 3)
+        return result
+
+    def latest(self):
+        """
+        Last probe result from any worker, probing now if there is none yet
+        """
+        from django.core.cache import cache
+
+        self.start()
+        return cache.get(EMAIL_PROBE_CACHE_KEY) or self.last or self.probe()
+
+    def _run(self):
+        from django.core.cache import cache
+
+        while True:
+            # Only one worker process probes per interval
+            if cache.add(EMAIL_PROBE_LOCK_KEY, True, self.interval):
+                try:
+                    self.probe()
+                except Exception as e:
+                    logger.error(f"Email diagnostics prober error: {str(e)}", exc_info=True)
+            time.sleep(self.interval)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='email-diagnostics', daemon=True)
+                self._thread.start()
+
+    def snapshot(self):
+        return {phase: histogram.snapshot() for phase, histogram in self.histograms.items()}
+
+
+_email_diagnostics = None
+_email_diagnostics_lock = threading.Lock()
+
+
+def get_email_diagnostics():
+    from django.conf import settings
+
+    global _email_diagnostics
+
+    with _email_diagnostics_lock:
+        if _email_diagnostics is None:
+            _email_diagnostics = EmailDiagnostics(
+                interval=getattr(settings, 'EMAIL_PROBE_INTERVAL_SECONDS', 300),
+                timeout=getattr(settings, 'EMAIL_TIMEOUT', None) or 15,
+            )
+    return _email_diagnostics
+
+
+# Wording and payload layout of the two email test endpoints
+EMAIL_TEST_PROFILES = {
+    'configuration': {
+        'mark': "✓ ",
+        'config_in_results': True,
+        'subject': 'MUBAS SOMASE - Email Configuration Test',
+        'body': 'This is a test email from your MUBAS SOMASE application.\n\nIf you received this, your email configuration is working correctly.',
+        'sent': "✓ Test email sent successfully",
+        'errors': {
+            'connect': ("✗ SMTP Connection Failed", 'Cannot connect to SMTP server. Check host and port.'),
+            'auth': ("✗ SMTP Authentication Failed", 'SMTP authentication failed. Check username and password.'),
+            'smtp': ("✗ SMTP Error", 'SMTP error occurred during testing.'),
+            'unexpected': ("✗ Unexpected Error", 'Unexpected error during email test.'),
+        },
+    },
+    'config': {
+        'mark': "",
+        'config_in_results': False,
+        'subject': 'MUBAS SOMASE - Email Test',
+        'body': 'This is a test email from your MUBAS SOMASE application.',
+        'sent': "Test email sent successfully",
+        'errors': {
+            'connect': ("SMTP Connection Failed", 'Cannot connect to SMTP server'),
+            'auth': ("SMTP Authentication Failed", 'SMTP authentication failed'),
+            'unexpected': ("Unexpected error", 'Email test failed'),
+        },
+    },
+}
+
+
+def _email_config_summary():
+    from django.conf import settings
+
+    return {
+        'host': settings.EMAIL_HOST,
+        'port': settings.EMAIL_PORT,
+        'use_tls': settings.EMAIL_USE_TLS,
+        'user': settings.EMAIL_HOST_USER,
+        'from_email': settings.DEFAULT_FROM_EMAIL
+    }
+
+
+def _send_requested(request):
+    params = getattr(request, 'query_params', request.GET)
+    return params.get('send', '').lower() in ('1', 'true', 'yes')
+
+
+def _send_test_email(profile):
+    from django.conf import settings
+    from django.core.mail import send_mail
+
+    send_mail(
+        profile['subject'],
+        profile['body'],
+        settings.DEFAULT_FROM_EMAIL,
+        [settings.DEFAULT_FROM_EMAIL],  # Send to yourself
+        fail_silently=False,
+        connection=get_mail_connection(),
+    )
+
+
+def _email_test_payload(profile_name, probe, sent=False, send_error=None):
+    """
+    Build the (payload, status_code) for an email test endpoint from a
+    probe result and the outcome of an optional real send
+    """
+    profile = EMAIL_TEST_PROFILES[profile_name]
+    mark = profile['mark']
+    test_results = {
+        'smtp_connection': probe['smtp_connection'],
+        'smtp_authentication': probe['smtp_authentication'],
+        'email_send': sent,
+        'details': [],
+        'probe': {
+            'checked_at': probe['checked_at'],
+            'phases': probe['phases'],
+        },
+    }
+    if profile['config_in_results']:
+        test_results['config'] = dict(_email_config_summary(), timeout=get_email_diagnostics().timeout)
+
+    if probe['smtp_connection']:
+        test_results['details'].append(f"{mark}SMTP connection successful")
+    if probe['smtp_authentication']:
+        test_results['details'].append(f"{mark}SMTP authentication successful")
+
+    if probe['error_kind']:
+        error_kind, error = probe['error_kind'], probe['error']
+    elif send_error is not None:
+        error_kind, error = _smtp_error_kind(send_error), str(send_error)
+    else:
+        error_kind = None
+
+    if error_kind:
+        label, message = profile['errors'].get(error_kind, profile['errors']['unexpected'])
+        test_results['details'].append(f"{label}: {error}")
+        return {
+            'success': False,
+            'error': message,
+            'results': test_results
+        }, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    if sent:
+        test_results['details'].append(profile['sent'])
+
+    if profile['config_in_results']:
+        payload = {
+            'success': True,
+            'message': 'Email configuration test passed',
+            'results': test_results
+        }
+    else:
+        payload = {
+            'success': True,
+            'results': test_results,
+            'config': _email_config_summary()
+        }
+    return payload, status.HTTP_200_OK
+
+
+def _run_email_test(request, profile_name):
+    probe = get_email_diagnostics().latest()
+    sent, send_error = False, None
+    if probe['smtp_authentication'] and _send_requested(request):
+        logger.info("Testing email send...")
+        try:
+            with span('smtp.test_send'):
+                _send_test_email(EMAIL_TEST_PROFILES[profile_name])
+            sent = True
+        except Exception as e:
+            send_error = e
+    return _email_test_payload(profile_name, probe, sent, send_error)
+
+
+REGISTRATION_EMAIL_TAKEN = 'An account with this email already exists. Please use a different email.'
+REGISTRATION_USERNAME_TAKEN = 'Username already taken. Please choose a different username.'
+
+
+def _registration_conflict(email, username):
+    """
+    Return the error message for an existing email/username, or None.
+    Both are checked in one query; an email clash is reported first.
+    """
+    return _conflict_message(email, list(_registration_conflict_rows(email, username)))
+
+
+def _registration_conflict_rows(email, username):
+    return (
+        CustomUser.objects
+        .filter(Q(email=email) | Q(username=username))
+        .values_list('email', 'username')[:2]
+    )
+
+
+def _conflict_message(email, taken):
+    if any(existing_email == email for existing_email, _ in taken):
+        return REGISTRATION_EMAIL_TAKEN
+    if taken:
+        return REGISTRATION_USERNAME_TAKEN
+    return None
+
+
+# Column or constraint name in the unique-violation messages of SQLite,
+# PostgreSQL and MySQL respectively
+_UNIQUE_VIOLATION_PATTERNS = (
+    re.compile(r'UNIQUE constraint failed: \w+\.(\w+)'),
+    re.compile(r'Key \((\w+)\)='),
+    re.compile(r"for key '(?:\w+\.)?(\w+)'"),
+)
+
+
+def _integrity_error_message(error):
+    """
+    Map a unique-constraint violation on user creation to the same message
+    the pre-check would have produced, or None when the violated constraint
+    is not the email or username one
+    """
+    message = str(error)
+    for pattern in _UNIQUE_VIOLATION_PATTERNS:
+        match = pattern.search(message)
+        if not match:
+            continue
+        parts = match.group(1).lower().split('_')
+        if 'username' in parts:
+            return REGISTRATION_USERNAME_TAKEN
+        if 'email' in parts:
+            return REGISTRATION_EMAIL_TAKEN
+    return None
+
+
+def _register_new_user(request, data):
+    """
+    Validate and create an inactive user, spool their photo and queue the
+    activation email. Returns (payload, status_code); shared by the sync and
+    async registration views. A user created before an unexpected error is
+    removed again before the error propagates.
+    """
+    from django.conf import settings
+
+    user = None
+    try:
+        # Create the new user using serializer
+        serializer = UserRegistrationSerializer(data=data)
+        
+        with span('register.validate'):
+            is_valid = serializer.is_valid()
+        
+        if is_valid:
+            # Create the inactive user in a single INSERT. The unique
+            # constraints settle any race with a concurrent signup.
+            try:
+                with span('register.create_user'), transaction.atomic():
+                    user = serializer.save(
+                        is_active=False,
+                        is_email_verified=False
+                    )
+                    # Guard against a serializer create() that drops the
+                    # extra save() kwargs: the account must never start active
+                    if user.is_active or user.is_email_verified:
+                        logger.warning(f"Serializer ignored is_active=False for {user.email}; forcing it")
+                        CustomUser.objects.filter(pk=user.pk).update(is_active=False, is_email_verified=False)
+                        user.is_active = False
+                        user.is_email_verified = False
+            except IntegrityError as e:
+                message = _integrity_error_message(e)
+                if message is None:
+                    # Not a duplicate email/username; answered with a 500
+                    raise
+                logger.info(f"Concurrent registration rejected for {data['email']}: {str(e)}")
+                return {
+                    'error': message
+                }, status.HTTP_400_BAD_REQUEST
+            
+            # Spool the profile photo; it is resized and uploaded in the
+            # background and profile_photo is set once that finishes
+            if 'profile_photo' in request.FILES:
+                try:
+                    with span('register.photo_spool'):
+                        schedule_profile_photo(user.pk, request.FILES['profile_photo'])
+                except Exception as e:
+                    logger.error(f"Could not spool profile photo: {str(e)}", exc_info=True)
+            
+            # Generate verification token and URL
+            current_site = get_current_site(request)
+            uid = urlsafe_base64_encode(force_bytes(user.pk))
+            token = account_activation_token.make_token(user)
+            
+            # Render the precompiled activation email
+            activation_url = f"{settings.FRONTEND_URL}/activate/{uid}/{token}"
+            mail_subject, text_content, html_content = ACTIVATION_EMAIL.render(
+                username=user.username,
+                activation_url=activation_url,
+                year=timezone.now().year
+            )
+            
+            # Hand the message to the outbound queue; the mail worker
+            # delivers it with retries so SMTP latency never blocks signup
+            with span('register.enqueue_email'):
+                enqueue_email(
+                    mail_subject,
+                    text_content,
+                    [user.email],
+                    html_content=html_content,
+                    reply_to=[settings.DEFAULT_FROM_EMAIL]
+                )
+            logger.info(f"Verification email queued for {user.email}")
+            
+            return {
+                'message': 'Registration successful! Please check your MUBAS email to verify your account. You will be automatically logged in after verification.',
+                'user_id': user.id,
+                'email_sent': True
+            }, status.HTTP_201_CREATED
+                
+        else:
+            # Return detailed validation errors
+            error_messages = []
+            for field, errors in serializer.errors.items():
+                for error in errors:
+                    error_messages.append(f"{field}: {error}")
+            
+            return {
+                'error': 'Please correct the following errors:',
+                'details': error_messages
+            }, status.HTTP_400_BAD_REQUEST
+    except Exception:
+        if user and user.pk:
+            try:
+                user.delete()
+                logger.info("Cleaned up user due to registration error")
+            except Exception as delete_error:
+                logger.error(f"Error cleaning up user: {str(delete_error)}")
+        raise
+
+
+ELECTION_ADMIN_ROLES = ('moderator', 'president', 'vice_president')
+
+
+class IsElectionAdmin(permissions.BasePermission):
+    """
+    Roles that get the election dashboard
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and getattr(user, 'role', None) in ELECTION_ADMIN_ROLES)
+
+
+# ---------------------------------------------------------------------------
+# Account activation
+#
+# Activation links are often clicked twice, and in bursts after a
+# registration drive. A link that has already been used is answered from the
+# cache without decoding, loading the user or recomputing the token HMAC.
+# The first click flips the flags with one conditional UPDATE, so of two
+# racing clicks exactly one activates and logs the user in.
+# ---------------------------------------------------------------------------
+
+ACTIVATED_LINK_TTL = 60 * 60 * 24 * 7
+
+
+def _activated_link_key(uidb64, token):
+    # Keyed by the whole link so only its holder learns the account is active
+    digest = hashlib.sha256(f"{uidb64}/{token}".encode()).hexdigest()
+    return f"activated_link:{digest}"
+
+
+def _dashboard_path(role):
+    # Same routing as the login page
+    if role in ELECTION_ADMIN_ROLES:
+        return '/ElectionDashboard'
+    return '/VotingDashboard'
+
+
+def _already_activated(request, user_id, dashboard):
+    from django.conf import settings
+    from django.contrib.auth import SESSION_KEY
+
+    request = getattr(request, '_request', request)
+    logged_in = str(request.session.get(SESSION_KEY)) == str(user_id)
+    return {
+        'success': True,
+        'message': 'Your email is already verified.' if logged_in else 'Your email is already verified. Please log in.',
+        'redirect_url': f"{settings.FRONTEND_URL}{dashboard if logged_in else '/login'}",
+    }, status.HTTP_200_OK
+
+
+def activate_account(request, uidb64, token):
+    """
+    Verify an activation link, activate the user and log them in.
+    Returns (payload, status) in the shape ActivationHandler expects.
+    """
+    from django.conf import settings
+    from django.contrib.auth import login
+    from django.core.cache import cache
+    from django.utils.encoding import force_str
+    from django.utils.http import urlsafe_base64_decode
+
+    key = _activated_link_key(uidb64, token)
+    cached = cache.get(key)
+    if cached is not None:
+        return _already_activated(request, cached['user_id'], cached['dashboard'])
+
+    try:
+        user_id = force_str(urlsafe_base64_decode(uidb64))
+        with span('activation.load_user'):
+            user = CustomUser._base_manager.get(pk=user_id)
+    except (TypeError, ValueError, OverflowError, CustomUser.DoesNotExist):
+        user = None
+
+    if user is None or not account_activation_token.check_token(user, token):
+        if user is not None and user.is_active:
+            # The token stops validating once the account is active
+            return _already_activated(request, user.pk, _dashboard_path(getattr(user, 'role', None)))
+        return {
+            'success': False,
+            'message': 'This verification link is invalid or has expired.',
+            'redirect_url': f"{settings.FRONTEND_URL}/register",
+        }, status.HTTP_400_BAD_REQUEST
+
+    with span('activation.update'):
+        activated = (
+            CustomUser._base_manager
+            .filter(pk=user.pk, is_active=False)
+            .update(is_active=True, is_email_verified=True)
+        )
+    dashboard = _dashboard_path(getattr(user, 'role', None))
+    cache.set(key, {'user_id': user.pk, 'dashboard': dashboard}, ACTIVATED_LINK_TTL)
+    # update() does not send post_save
+    invalidate_auth_snapshot(user.pk)
+    if not activated:
+        return _already_activated(request, user.pk, dashboard)
+
+    user.is_active = True
+    user.is_email_verified = True
+    backends = getattr(settings, 'AUTHENTICATION_BACKENDS', None) or ['django.contrib.auth.backends.ModelBackend']
+    login(getattr(request, '_request', request), user, backend=backends[0])
+
+    # Seed the snapshot so the dashboard's first /api/auth/check/ is a cache hit
+    cache.set(_auth_snapshot_key(user.pk), {
+        'user': build_auth_snapshot(user),
+        'session_hash': user.get_session_auth_hash(),
+    }, AUTH_SNAPSHOT_TTL)
+    logger.info(f"Activated user {user.pk}")
+
+    return {
+        'success': True,
+        'message': 'Your email has been verified successfully.',
+        'redirect_url': f"{settings.FRONTEND_URL}{dashboard}",
+    }, status.HTTP_200_OK
+
+
+@rate_limit('register')
 @api_view(['POST', 'OPTIONS'])
 @permission_classes([permissions.AllowAny])
 @csrf_exempt
@@ -14,7 +2991,6 @@ def register_view(request):
         return response
         
     if request.method == 'POST':
-        user = None
         try:
             # For file uploads, use request.data directly
             if request.content_type.startswith('multipart/form-data'):
@@ -35,276 +3011,21 @@ def register_view(request):
                         'error': f'Missing required field: {field}'
                     }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Check if user already exists
-            if CustomUser.objects.filter(email=data['email']).exists():
+            # Check email and username in a single query
+            with span('register.uniqueness_check'):
+                conflict = _registration_conflict(data['email'], data['username'])
+            if conflict:
                 return Response({
-                    'error': 'An account with this email already exists. Please use a different email.'
+                    'error': conflict
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            if CustomUser.objects.filter(username=data['username']).exists():
-                return Response({
-                    'error': 'Username already taken. Please choose a different username.'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Create the new user using serializer
-            serializer = UserRegistrationSerializer(data=data)
-            
-            if serializer.is_valid():
-                # Create user but set as inactive initially
-                user = serializer.save()
-                user.is_active = False
-                user.is_email_verified = False
-                
-                # Handle profile photo upload to Cloudinary
-                if 'profile_photo' in request.FILES:
-                    profile_photo = request.FILES['profile_photo']
-                    try:
-                        upload_result = cloudinary.uploader.upload(
-                            profile_photo,
-                            folder='voting_app/profiles/',
-                            resource_type='image',
-                            timeout=30
-                        )
-                        user.profile_photo = upload_result['secure_url']
-                        logger.info(f"Profile photo uploaded successfully: {upload_result['secure_url']}")
-                    except Exception as e:
-                        logger.error(f"Cloudinary upload error: {str(e)}", exc_info=True)
-                        user.profile_photo = None
-                
-                user.save()
-                
-                # Generate verification token and URL
-                current_site = get_current_site(request)
-                uid = urlsafe_base64_encode(force_bytes(user.pk))
-                token = account_activation_token.make_token(user)
-                
-                # Create HTML email message
-                mail_subject = 'Activate your MUBAS SOMASE Voting account'
-                
-                # HTML content with styling
-                html_content = f"""
-                <!DOCTYPE html>
-                <html lang="en">
-                <head>
-                    <meta charset="UTF-8">
-                    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                    <title>Email Verification</title>
-                    <style>
-                        body {{
-                            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                            line-height: 1.6;
-                            color: #333;
-                            background-color: #f9f9f9;
-                            margin: 0;
-                            padding: 0;
-                        }}
-                        .container {{
-                            max-width: 600px;
-                            margin: 0 auto;
-                            background-color: #ffffff;
-                            padding: 20px;
-                            border-radius: 8px;
-                            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-                        }}
-                        .header {{
-                            text-align: center;
-                            padding: 20px 0;
-                            background-color: #1e4a76;
-                            color: white;
-                            border-radius: 8px 8px 0 0;
-                        }}
-                        .content {{
-                            padding: 20px;
-                        }}
-                        .button {{
-                            display: inline-block;
-                            padding: 12px 24px;
-                            background-color: #1e4a76;
-                            color: white;
-                            text-decoration: none;
-                            border-radius: 4px;
-                            margin: 20px 0;
-                            font-weight: bold;
-                        }}
-                        .footer {{
-                            text-align: center;
-                            padding: 20px;
-                            font-size: 12px;
-                            color: #666;
-                        }}
-                        .verification-link {{
-                            word-break: break-all;
-                            color:#1e4a76;
-                            font-weight: bold;
-                        }}
-                    </style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="header">
-                            <h1>MUBAS SOMASE</h1>
-                             <h2>Email Verification</h2>
-                        </div>
-                        <div class="content">
-                            <h2>Hello {user.username},</h2>
-                            <p>Thank you for registering as a MUBAS SOMASE member. To complete your registration, please verify your email address by clicking the button below:</p>
-                            
-                            <center>
-                                <a style="color:white" href="{settings.FRONTEND_URL}/activate/{uid}/{token}" class="button">
-                                    Verify Email Address
-                                </a>
-                            </center>
-                            
-                            <p>Or copy and paste the following link into your browser:</p>
-                            <p class="verification-link">{settings.FRONTEND_URL}/activate/{uid}/{token}</p>
-                            
-                            <p>If you didn't request this registration, please ignore this email.</p>
-                            
-                            <p>Best regards,<br>The MUBAS SOMASE Team</p>
-                        </div>
-                        <div class="footer">
-                            <p>This is an automated message. Please do not reply to this email.</p>
-                            <p>&copy; {timezone.now().year} SOMASE Voting System. All rights reserved.</p>
-                        </div>
-                    </div>
-                </body>
-                </html>
-                """
-                
-                # Plain text version
-                text_content = f"""Hi {user.username},
-
-Please click on the link below to confirm your registration for the SOMASE Voting System:
-
-{settings.FRONTEND_URL}/activate/{uid}/{token}
-
-If you didn't register for this account, please ignore this email.
-
-Thank you,
-MUBAS SOMASE Team"""
-                
-                # Enhanced email sending with detailed error handling
-                try:
-                    # Log email configuration (without password)
-                    logger.info(f"Attempting to send verification email to {user.email}")
-                    logger.info(f"Email host: {settings.EMAIL_HOST}")
-                    logger.info(f"Email port: {settings.EMAIL_PORT}")
-                    logger.info(f"Email use TLS: {settings.EMAIL_USE_TLS}")
-                    logger.info(f"From email: {settings.DEFAULT_FROM_EMAIL}")
-                    
-                    # Test SMTP connection before sending
-                    logger.info("Testing SMTP connection...")
-                    if settings.EMAIL_USE_TLS:
-                        server = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT, timeout=15)
-                        server.starttls()
-                    else:
-                        server = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT, timeout=15)
-                    
-                    # Test authentication
-                    server.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
-                    server.quit()
-                    logger.info("SMTP connection test successful")
-                    
-                    # Create and send email
-                    email = EmailMultiAlternatives(
-                        mail_subject,
-                        text_content,
-                        settings.DEFAULT_FROM_EMAIL,
-                        [user.email],
-                        reply_to=[settings.DEFAULT_FROM_EMAIL]
-                    )
-                    email.attach_alternative(html_content, "text/html")
-                    
-                    # Send with timeout
-                    email.connection = None  # Force new connection
-                    email.send(fail_silently=False)
-                    
-                    logger.info(f"Verification email sent successfully to {user.email}")
-                    
-                    response = Response({
-                        'message': 'Registration successful! Please check your MUBAS email to verify your account. You will be automatically logged in after verification.',
-                        'user_id': user.id,
-                        'email_sent': True
-                    }, status=status.HTTP_201_CREATED)
-                    
-                except smtplib.SMTPAuthenticationError as e:
-                    logger.error(f"SMTP Authentication Failed: {str(e)}")
-                    if user:
-                        user.delete()
-                    response = Response({
-                        'error': 'Email service authentication failed. This is a server configuration issue. Please contact support.',
-                        'error_type': 'smtp_authentication'
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                    
-                except smtplib.SMTPConnectError as e:
-                    logger.error(f"SMTP Connection Error: {str(e)}")
-                    if user:
-                        user.delete()
-                    response = Response({
-                        'error': 'Cannot connect to email service. Please check your internet connection and try again later.',
-                        'error_type': 'smtp_connection'
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                    
-                except smtplib.SMTPServerDisconnected as e:
-                    logger.error(f"SMTP Server Disconnected: {str(e)}")
-                    if user:
-                        user.delete()
-                    response = Response({
-                        'error': 'Email server disconnected unexpectedly. Please try again.',
-                        'error_type': 'smtp_disconnected'
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                    
-                except smtplib.SMTPException as e:
-                    logger.error(f"SMTP Error: {str(e)}")
-                    if user:
-                        user.delete()
-                    response = Response({
-                        'error': 'Email delivery failed. Please check if your email address is valid and try again.',
-                        'error_type': 'smtp_general'
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                    
-                except TimeoutError as e:
-                    logger.error(f"Email sending timeout: {str(e)}")
-                    if user:
-                        user.delete()
-                    response = Response({
-                        'error': 'Email service timeout. Please try again in a few moments.',
-                        'error_type': 'timeout'
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                    
-                except Exception as e:
-                    logger.error(f"Unexpected email error: {str(e)}", exc_info=True)
-                    if user:
-                        user.delete()
-                    response = Response({
-                        'error': 'Failed to send verification email due to an unexpected error. Please try again or contact support.',
-                        'error_type': 'unexpected'
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                    
-            else:
-                # Return detailed validation errors
-                error_messages = []
-                for field, errors in serializer.errors.items():
-                    for error in errors:
-                        error_messages.append(f"{field}: {error}")
-                
-                response = Response({
-                    'error': 'Please correct the following errors:',
-                    'details': error_messages
-                }, status=status.HTTP_400_BAD_REQUEST)
+            response = Response(*_register_new_user(request, data))
                 
         except Exception as e:
             # Log the exception for debugging
             logger.error(f"Registration process error: {str(e)}", exc_info=True)
             
-            # Clean up user if it was created
-            if user and user.pk:
-                try:
-                    user.delete()
-                    logger.info("Cleaned up user due to registration error")
-                except Exception as delete_error:
-                    logger.error(f"Error cleaning up user: {str(delete_error)}")
-            
+            # _register_new_user has already removed any half-created user
             response = Response({
                 'error': 'An unexpected error occurred during registration. Please try again later.',
                 'error_type': 'registration_process'
@@ -316,191 +3037,658 @@ MUBAS SOMASE Team"""
         return response
 
 # Additional endpoint for email configuration testing
+@rate_limit('email_test')
 @api_view(['GET', 'POST'])
 @permission_classes([permissions.AllowAny])
 @csrf_exempt
 def test_email_configuration(request):
     """
-    Endpoint to test email configuration (for admin debugging)
+    Endpoint to test email configuration (for admin debugging).
+    Reports the background SMTP probe; add ?send=true to also send a
+    real test email.
     """
-    from django.core.mail import send_mail
-    from django.conf import settings
-    import smtplib
-    
-    test_results = {
-        'smtp_connection': False,
-        'smtp_authentication': False,
-        'email_send': False,
-        'details': [],
-        'config': {
-            'host': settings.EMAIL_HOST,
-            'port': settings.EMAIL_PORT,
-            'use_tls': settings.EMAIL_USE_TLS,
-            'user': settings.EMAIL_HOST_USER,
-            'from_email': settings.DEFAULT_FROM_EMAIL,
-            'timeout': 15
-        }
-    }
-    
-    try:
-        # Test 1: SMTP Connection
-        logger.info("Testing SMTP connection...")
-        if settings.EMAIL_USE_TLS:
-            server = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT, timeout=15)
-            server.starttls()
-        else:
-            server = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT, timeout=15)
-        
-        test_results['smtp_connection'] = True
-        test_results['details'].append("✓ SMTP connection successful")
-        
-        # Test 2: SMTP Authentication
-        logger.info("Testing SMTP authentication...")
-        server.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
-        test_results['smtp_authentication'] = True
-        test_results['details'].append("✓ SMTP authentication successful")
-        server.quit()
-        
-        # Test 3: Send Test Email
-        logger.info("Testing email send...")
-        send_mail(
-            'MUBAS SOMASE - Email Configuration Test',
-            'This is a test email from your MUBAS SOMASE application.\n\nIf you received this, your email configuration is working correctly.',
-            settings.DEFAULT_FROM_EMAIL,
-            [settings.DEFAULT_FROM_EMAIL],  # Send to yourself
-            fail_silently=False,
-        )
-        test_results['email_send'] = True
-        test_results['details'].append("✓ Test email sent successfully")
-        
-        return Response({
-            'success': True,
-            'message': 'Email configuration test passed',
-            'results': test_results
-        })
-        
-    except smtplib.SMTPConnectError as e:
-        test_results['details'].append(f"✗ SMTP Connection Failed: {str(e)}")
-        return Response({
-            'success': False,
-            'error': 'Cannot connect to SMTP server. Check host and port.',
-            'results': test_results
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-    except smtplib.SMTPAuthenticationError as e:
-        test_results['details'].append(f"✗ SMTP Authentication Failed: {str(e)}")
-        return Response({
-            'success': False,
-            'error': 'SMTP authentication failed. Check username and password.',
-            'results': test_results
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-    except smtplib.SMTPException as e:
-        test_results['details'].append(f"✗ SMTP Error: {str(e)}")
-        return Response({
-            'success': False,
-            'error': 'SMTP error occurred during testing.',
-            'results': test_results
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-    except Exception as e:
-        test_results['details'].append(f"✗ Unexpected Error: {str(e)}")
-        return Response({
-            'success': False,
-            'error': 'Unexpected error during email test.',
-            'results': test_results
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    payload, status_code = _run_email_test(request, 'configuration')
+    return Response(payload, status=status_code)
 # In your Django views.py
 @api_view(['DELETE'])
 @login_required
 def delete_user_account(request):
     try:
-        user = request.user
-        user.delete()
+        delete_user(request.user)
         return Response({'message': 'Account deleted successfully'}, status=200)
     except Exception as e:
         return Response({'error': str(e)}, status=400)
+@rate_limit('email_test')
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
 def test_email_config(request):
     """
-    Endpoint to test email configuration (for admin use)
+    Endpoint to test email configuration (for admin use).
+    Reports the background SMTP probe; add ?send=true to also send a
+    real test email.
+    """
+    payload, status_code = _run_email_test(request, 'config')
+    return Response(payload, status=status_code)
+
+
+@api_view(['POST'])
+@permission_classes([IsElectionAdmin])
+def send_election_start_emails(request):
+    """
+    Start the election-start broadcast to every active user.
+    Returns immediately with a job id; poll election_email_status for progress.
     """
-    from django.core.mail import send_mail
     from django.conf import settings
-    import smtplib
-    import logging
-    
-    logger = logging.getLogger(__name__)
-    
-    test_results = {
-        'smtp_connection': False,
-        'smtp_authentication': False,
-        'email_send': False,
-        'details': []
-    }
-    
+
+    recipients = (
+        CustomUser.objects
+        .filter(is_active=True)
+        .exclude(email='')
+        .order_by('pk')
+        .values_list('email', 'username')
+    )
+    job = send_bulk_email(
+        'election_start',
+        recipients,
+        ELECTION_START_EMAIL,
+        context={
+            'election_title': request.data.get('election_title') or 'The SOMASE Executive Election',
+            'end_date': request.data.get('end_date') or 'the announced deadline',
+            'voting_url': f"{settings.FRONTEND_URL}/VotingDashboard",
+        },
+    )
+    # The dashboard calls this right after opening the election
+    publish_election_event('election_start')
+
+    return Response({
+        'success': True,
+        'message': 'Election start emails are being sent',
+        'job_id': job.id
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([IsElectionAdmin])
+def election_email_status(request, job_id):
+    """
+    Progress of a bulk email job started by send_election_start_emails
+    """
+    job = get_background_job(job_id)
+    if job is None:
+        return Response({'error': 'Email job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job)
+
+
+@api_view(['GET'])
+@permission_classes([IsElectionAdmin])
+def check_election_end(request):
+    """
+    Polled by the admin dashboard: closes the election once its end date
+    has passed. {"status": "ended"} tells the dashboard to pick up the
+    final results.
+    """
+    return Response({'status': close_election()})
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def election_results(request):
+    """
+    /api/results/: the final snapshot once the election is closed, the live
+    tally until then. An unchanged tally is answered 304 without a query.
+    """
+    snapshot = current_results_snapshot()
+    if snapshot is None:
+        snapshot = live_results()
+    return results_snapshot_response(request, snapshot)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def election_final_results(request, snapshot_id):
+    """
+    A finalized snapshot under its versioned URL. The content behind a
+    snapshot id never changes, so it may be cached for good.
+    """
+    from django.http import HttpResponse
+
+    snapshot = get_results_snapshot(snapshot_id) if re.fullmatch(r'[\w-]+', snapshot_id) else None
+    if snapshot is None:
+        return Response({'error': 'Results snapshot not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    _, body, etag = snapshot
+    response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = f"private, max-age={RESULTS_SNAPSHOT_MAX_AGE}, immutable"
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsElectionAdmin])
+def election_results_export(request):
+    """
+    CSV export of the final results of the last closed election
+    """
+    from django.http import FileResponse
+
+    snapshot = current_results_snapshot()
+    if snapshot is None:
+        return Response({'error': 'Results are not final yet'}, status=status.HTTP_404_NOT_FOUND)
+
+    snapshot_id = snapshot[0]['snapshot_id']
+    _, csv_path = _results_snapshot_paths(snapshot_id)
     try:
-        # Test 1: SMTP Connection
-        logger.info("Testing SMTP connection...")
-        if settings.EMAIL_USE_TLS:
-            server = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT, timeout=10)
-            server.starttls()
-        else:
-            server = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT, timeout=10)
-        
-        test_results['smtp_connection'] = True
-        test_results['details'].append("SMTP connection successful")
-        
-        # Test 2: SMTP Authentication
-        logger.info("Testing SMTP authentication...")
-        server.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
-        test_results['smtp_authentication'] = True
-        test_results['details'].append("SMTP authentication successful")
-        server.quit()
-        
-        # Test 3: Send Test Email
-        logger.info("Testing email send...")
-        send_mail(
-            'MUBAS SOMASE - Email Test',
-            'This is a test email from your MUBAS SOMASE application.',
-            settings.DEFAULT_FROM_EMAIL,
-            [settings.DEFAULT_FROM_EMAIL],  # Send to yourself
-            fail_silently=False,
+        export = open(csv_path, 'rb')
+    except FileNotFoundError:
+        # Discarded since the lookup
+        return Response({'error': 'Results are not final yet'}, status=status.HTTP_404_NOT_FOUND)
+    response = FileResponse(
+        export,
+        as_attachment=True,
+        filename=f"election-{snapshot_id}-results.csv.gz",
+        content_type='application/gzip'
+    )
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([IsElectionAdmin])
+def reset_votes(request):
+    """
+    Start deleting all votes and zeroing the tallies.
+    Returns immediately with a job id; poll background_job_status for progress.
+    """
+    job = start_vote_reset()
+    return Response({
+        'success': True,
+        'message': 'Votes are being reset',
+        'job_id': job.id
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['DELETE'])
+@permission_classes([IsElectionAdmin])
+def delete_all_candidates(request):
+    """
+    Start deleting every candidate application.
+    Returns immediately with a job id; poll background_job_status for progress.
+    """
+    job = start_candidate_delete()
+    return Response({
+        'success': True,
+        'message': 'Candidate applications are being deleted',
+        'job_id': job.id
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_vote(request):
+    """
+    Record a voter's whole ballot: {"votes": [{"position", "candidate_id"}, ...]}.
+    Answers 409 if the voter has already voted, 403 outside the election.
+    """
+    choices, error = _parse_ballot(request.data, candidate_positions())
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+    outcome = record_ballot(request.user.pk, choices)
+    if outcome == 'closed':
+        return Response({'error': 'The election is not open for voting'}, status=status.HTTP_403_FORBIDDEN)
+    if outcome == 'duplicate':
+        return _ballot_conflict()
+
+    logger.info(f"Ballot recorded for user {request.user.pk} ({len(choices)} positions)")
+    return Response({
+        'success': True,
+        'message': 'Your votes have been recorded',
+        'votes': len(choices)
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def candidates_list(request):
+    """
+    Approved candidates for the voting dashboard; ?position= narrows the list
+    """
+    return candidate_list_response(request, 'ballot', 'public, no-cache')
+
+
+@api_view(['GET'])
+@permission_classes([IsElectionAdmin])
+def candidate_applications(request):
+    """
+    Every candidate application for the admin dashboard; ?position= narrows
+    the list
+    """
+    return candidate_list_response(request, 'applications', 'private, no-cache')
+
+
+@api_view(['PATCH'])
+@permission_classes([IsElectionAdmin])
+def candidate_status(request, candidate_id):
+    """
+    Approve, reject or reset an application: {"status": "approved"}
+    """
+    Candidate = _election_model('ELECTION_CANDIDATE_MODEL', 'elections.Candidate')
+
+    new_status = request.data.get('status')
+    if new_status not in CANDIDATE_STATUSES:
+        return Response(
+            {'error': f"Status must be one of: {', '.join(CANDIDATE_STATUSES)}"},
+            status=status.HTTP_400_BAD_REQUEST
         )
-        test_results['email_send'] = True
-        test_results['details'].append("Test email sent successfully")
-        
-        return Response({
-            'success': True,
-            'results': test_results,
-            'config': {
-                'host': settings.EMAIL_HOST,
-                'port': settings.EMAIL_PORT,
-                'use_tls': settings.EMAIL_USE_TLS,
-                'user': settings.EMAIL_HOST_USER,
-                'from_email': settings.DEFAULT_FROM_EMAIL
-            }
-        })
-        
-    except smtplib.SMTPConnectError as e:
-        test_results['details'].append(f"SMTP Connection Failed: {str(e)}")
-        return Response({
-            'success': False,
-            'error': 'Cannot connect to SMTP server',
-            'results': test_results
-        }, status=500)
-    except smtplib.SMTPAuthenticationError as e:
-        test_results['details'].append(f"SMTP Authentication Failed: {str(e)}")
-        return Response({
-            'success': False,
-            'error': 'SMTP authentication failed',
-            'results': test_results
-        }, status=500)
+    try:
+        candidate = Candidate._base_manager.only('pk', 'status').get(pk=candidate_id)
+    except Candidate.DoesNotExist:
+        return Response({'error': 'Candidate not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    # save() rather than update(): post_save retires the cached lists
+    candidate.status = new_status
+    candidate.save(update_fields=['status'])
+    logger.info(f"Candidate {candidate_id} set to {new_status} by user {request.user.pk}")
+    return Response({'success': True, 'id': candidate.pk, 'status': new_status})
+
+
+@api_view(['GET'])
+@permission_classes([IsElectionAdmin])
+def background_job_status(request, job_id):
+    """
+    Progress of any background job, e.g. a chunked delete started by an
+    admin action. The dashboard polls it at /api/jobs/<job_id>/.
+    """
+    job = get_background_job(job_id)
+    if job is None:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job)
+
+
+# ---------------------------------------------------------------------------
+# Election event stream
+#
+# Views that change election state call publish_election_event(); browsers
+# receive the events over Server-Sent Events (or long-poll as a fallback)
+# instead of polling each endpoint. Events live in the shared cache under
+# a monotonically increasing id so every worker process sees them.
+#
+# Both event views hold their request open, so they are only served under
+# ASGI. Under WSGI they answer 501 and the dashboards keep interval polling:
+# a sync worker would drain the endless stream into a list and be pinned
+# for good. Listeners must be logged in; admin-only events (audit-log
+# counts) are filtered out for everyone else.
+# ---------------------------------------------------------------------------
+
+ELECTION_EVENT_TTL = 60 * 10
+ELECTION_EVENT_LAST_ID_KEY = 'election_events:last_id'
+ADMIN_ONLY_ELECTION_EVENTS = ('audit_log',)
+
+
+def _election_event_key(event_id):
+    return f"election_events:{event_id}"
+
+
+def publish_election_event(event_type, data=None):
+    """
+    Record an event such as 'election_start', 'election_end',
+    'settings_changed', 'audit_log' or 'results' for all listeners
+    """
+    from django.core.cache import cache
+
+    cache.add(ELECTION_EVENT_LAST_ID_KEY, 0, None)
+    event_id = cache.incr(ELECTION_EVENT_LAST_ID_KEY)
+    cache.set(_election_event_key(event_id), {
+        'id': event_id,
+        'type': event_type,
+        'data': data or {},
+    }, ELECTION_EVENT_TTL)
+    return event_id
+
+
+async def _election_events_since(last_id):
+    """
+    (current id, events after last_id). last_id=None only reads the
+    current position.
+    """
+    from django.core.cache import cache
+
+    current = await cache.aget(ELECTION_EVENT_LAST_ID_KEY) or 0
+    if last_id is None:
+        return current, []
+    if current < last_id:
+        # The counter went backwards (cache flush, or a per-process cache
+        # behind several workers): everything up to it is unseen
+        last_id = 0
+    if current == last_id:
+        return current, []
+    # Anything older than the TTL is gone; clients refetch on reconnect anyway
+    first = max(last_id + 1, current - 100)
+    found = await cache.aget_many([_election_event_key(i) for i in range(first, current + 1)])
+    events = [found[key] for key in sorted(found, key=lambda key: found[key]['id'])]
+    return current, events
+
+
+def _parse_last_event_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _event_response(response):
+    from django.conf import settings
+
+    response['Access-Control-Allow-Origin'] = settings.FRONTEND_URL
+    response['Access-Control-Allow-Credentials'] = 'true'
+    return response
+
+
+async def _event_listener(request):
+    """
+    (error response, is_admin) for an event request; the response is None
+    when the request may listen
+    """
+    from django.core.handlers.asgi import ASGIRequest
+    from django.http import JsonResponse
+
+    if not isinstance(request, ASGIRequest):
+        return _event_response(JsonResponse(
+            {'error': 'Election events need an ASGI server'},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )), False
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _event_response(JsonResponse(
+            {'error': 'Not authenticated'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )), False
+    return None, getattr(user, 'role', None) in ELECTION_ADMIN_ROLES
+
+
+def _visible_events(events, is_admin):
+    if is_admin:
+        return events
+    return [event for event in events if event['type'] not in ADMIN_ONLY_ELECTION_EVENTS]
+
+
+async def election_events(request):
+    """
+    Server-Sent Events stream of election events. Requires an ASGI server;
+    honours Last-Event-ID so reconnecting clients resume where they left off.
+    """
+    import asyncio
+    from django.conf import settings
+    from django.http import StreamingHttpResponse
+
+    refused, is_admin = await _event_listener(request)
+    if refused is not None:
+        return refused
+
+    poll_interval = getattr(settings, 'ELECTION_EVENTS_POLL_SECONDS', 1)
+    heartbeat_interval = 15
+
+    last_id = _parse_last_event_id(request.headers.get('Last-Event-ID'))
+    if last_id is None:
+        last_id, _ = await _election_events_since(None)
+
+    async def stream():
+        nonlocal last_id
+        # Ask the browser to wait before reconnecting after a drop
+        yield "retry: 5000\n\n"
+        idle = 0
+        while True:
+            last_id, events = await _election_events_since(last_id)
+            for event in _visible_events(events, is_admin):
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+            if events:
+                idle = 0
+            else:
+                idle += poll_interval
+                if idle >= heartbeat_interval:
+                    idle = 0
+                    yield ": keep-alive\n\n"
+            await asyncio.sleep(poll_interval)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return _event_response(response)
+
+
+async def election_events_poll(request):
+    """
+    Long-poll fallback for election_events: waits up to ?timeout= seconds
+    (max 30) for events newer than ?since= and returns them as JSON
+    """
+    import asyncio
+    from django.conf import settings
+    from django.http import JsonResponse
+
+    refused, is_admin = await _event_listener(request)
+    if refused is not None:
+        return refused
+
+    poll_interval = getattr(settings, 'ELECTION_EVENTS_POLL_SECONDS', 1)
+    since = _parse_last_event_id(request.GET.get('since'))
+    timeout = min(_parse_last_event_id(request.GET.get('timeout')) or 25, 30)
+
+    if since is None:
+        # First call only learns the current position
+        last_id, events = await _election_events_since(None)
+    else:
+        waited = 0
+        last_id, events = await _election_events_since(since)
+        events = _visible_events(events, is_admin)
+        while not events and waited < timeout:
+            await asyncio.sleep(poll_interval)
+            waited += poll_interval
+            last_id, events = await _election_events_since(since)
+            events = _visible_events(events, is_admin)
+
+    return _event_response(JsonResponse({'last_id': last_id, 'events': events}))
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def auth_check(request):
+    """
+    Current user snapshot for the dashboards. Authentication classes are
+    disabled so DRF does not load the user up front (request.user is
+    always anonymous here); get_auth_snapshot reads the session and only
+    loads the user on a cache miss. The payload is
+    narrower than the full profile; see build_auth_snapshot.
+    """
+    snapshot = get_auth_snapshot(request)
+    if snapshot is None:
+        return Response({'error': 'Not authenticated'}, status=status.HTTP_401_UNAUTHORIZED)
+    return Response(snapshot)
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def activate_account_view(request, uidb64, token):
+    """
+    Target of the activation link in the registration email
+    """
+    return Response(*activate_account(request, uidb64, token))
+
+
+# ---------------------------------------------------------------------------
+# Async (ASGI) variants
+#
+# Same JSON contracts as the DRF views above, but SMTP goes through
+# aiosmtplib (when installed) and the ORM through its async API, so one
+# worker can have many of these in flight at once.
+# ---------------------------------------------------------------------------
+
+def _method_not_allowed(request, allowed):
+    from django.http import JsonResponse
+
+    response = JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    response['Allow'] = ', '.join(allowed)
+    return response
+
+
+async def _async_send_test_email(profile):
+    """
+    Send the profile's test email to DEFAULT_FROM_EMAIL over aiosmtplib,
+    or the pooled smtplib path in a thread when it is not installed
+    """
+    from django.conf import settings
+
+    if aiosmtplib is None:
+        await sync_to_async(_send_test_email, thread_sensitive=False)(profile)
+        return
+
+    from email.message import EmailMessage
+
+    message = EmailMessage()
+    message['Subject'] = profile['subject']
+    message['From'] = settings.DEFAULT_FROM_EMAIL
+    message['To'] = settings.DEFAULT_FROM_EMAIL  # Send to yourself
+    message.set_content(profile['body'])
+
+    await aiosmtplib.send(
+        message,
+        hostname=settings.EMAIL_HOST,
+        port=settings.EMAIL_PORT,
+        username=settings.EMAIL_HOST_USER,
+        password=settings.EMAIL_HOST_PASSWORD,
+        start_tls=settings.EMAIL_USE_TLS,
+        timeout=get_email_diagnostics().timeout
+    )
+
+
+async def _async_run_email_test(request, profile_name):
+    # Only the very first call (before any probe) touches the network here
+    probe = await sync_to_async(get_email_diagnostics().latest, thread_sensitive=False)()
+    sent, send_error = False, None
+    if probe['smtp_authentication'] and _send_requested(request):
+        logger.info("Testing email send...")
+        try:
+            with span('smtp.test_send'):
+                await _async_send_test_email(EMAIL_TEST_PROFILES[profile_name])
+            sent = True
+        except Exception as e:
+            send_error = e
+    return _email_test_payload(profile_name, probe, sent, send_error)
+
+
+@rate_limit('email_test')
+@csrf_exempt
+async def test_email_configuration_async(request):
+    """
+    Async variant of test_email_configuration
+    """
+    from django.http import JsonResponse
+
+    if request.method not in ('GET', 'POST'):
+        return _method_not_allowed(request, ['GET', 'POST'])
+
+    payload, status_code = await _async_run_email_test(request, 'configuration')
+    return JsonResponse(payload, status=status_code)
+
+
+@rate_limit('email_test')
+@csrf_exempt
+async def test_email_config_async(request):
+    """
+    Async variant of test_email_config
+    """
+    from django.http import JsonResponse
+
+    if request.method != 'POST':
+        return _method_not_allowed(request, ['POST'])
+
+    payload, status_code = await _async_run_email_test(request, 'config')
+    return JsonResponse(payload, status=status_code)
+
+
+async def delete_user_account_async(request):
+    """
+    Async variant of delete_user_account
+    """
+    from django.http import JsonResponse
+
+    if request.method != 'DELETE':
+        return _method_not_allowed(request, ['DELETE'])
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication credentials were not provided.'}, status=401)
+
+    try:
+        await sync_to_async(delete_user)(user)
+        return JsonResponse({'message': 'Account deleted successfully'}, status=200)
     except Exception as e:
-        test_results['details'].append(f"Unexpected error: {str(e)}")
-        return Response({
-            'success': False,
-            'error': 'Email test failed',
-            'results': test_results
-        }, status=500)
\ No newline at end of file
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+async def _aregistration_conflict(email, username):
+    taken = [row async for row in _registration_conflict_rows(email, username)]
+    return _conflict_message(email, taken)
+
+
+@rate_limit('register')
+@csrf_exempt
+async def register_view_async(request):
+    """
+    Async variant of register_view. Request parsing and the uniqueness
+    check run on the event loop; serializer validation and the INSERT run
+    in a worker thread because DRF serializers are sync-only.
+    """
+    from django.conf import settings
+    from django.http import JsonResponse
+
+    if request.method == 'OPTIONS':
+        response = JsonResponse({})
+        response['Access-Control-Allow-Origin'] = settings.FRONTEND_URL
+        response['Access-Control-Allow-Credentials'] = 'true'
+        response['Access-Control-Allow-Headers'] = 'Content-Type, X-CSRFToken'
+        response['Access-Control-Allow-Methods'] = 'POST, OPTIONS'
+        return response
+
+    if request.method != 'POST':
+        return _method_not_allowed(request, ['POST', 'OPTIONS'])
+
+    try:
+        if request.content_type.startswith('multipart/form-data'):
+            data = request.POST
+        else:
+            try:
+                data = json.loads(request.body)
+            except json.JSONDecodeError:
+                return JsonResponse({
+                    'error': 'Invalid request format. Please check your input and try again.'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+        required_fields = ['username', 'email', 'password']
+        for field in required_fields:
+            if field not in data or not data[field]:
+                return JsonResponse({
+                    'error': f'Missing required field: {field}'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+        with span('register.uniqueness_check'):
+            conflict = await _aregistration_conflict(data['email'], data['username'])
+        if conflict:
+            return JsonResponse({
+                'error': conflict
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        payload, status_code = await sync_to_async(_register_new_user)(request, data)
+        response = JsonResponse(payload, status=status_code)
+
+    except Exception as e:
+        logger.error(f"Registration process error: {str(e)}", exc_info=True)
+        response = JsonResponse({
+            'error': 'An unexpected error occurred during registration. Please try again later.',
+            'error_type': 'registration_process'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    response['Access-Control-Allow-Origin'] = settings.FRONTEND_URL
+    response['Access-Control-Allow-Credentials'] = 'true'
+    return response
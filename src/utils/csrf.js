@@ -34,39 +34,55 @@ export function getCookie(name) {
     return cookieValue;
 }
 
+// Token returned by /get-csrf/ when the cookie is not readable (the API is
+// on another origin), and the in-flight request so concurrent callers share it
+let cachedCSRFToken = null;
+let pendingCSRFRequest = null;
+
+export function clearCSRFToken() {
+    cachedCSRFToken = null;
+    pendingCSRFRequest = null;
+}
+
+async function requestCSRFToken(BASE_URL) {
+    // If no token exists, make a GET request to get one
+    const response = await fetch(`${BASE_URL}/get-csrf/`, {
+        method: 'GET',
+        credentials: 'include',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+    });
+    
+    if (!response.ok) {
+        console.error('Failed to get CSRF token, status:', response.status);
+        return null;
+    }
+    
+    const data = await response.json();
+    console.log('New CSRF token obtained:', data.csrfToken ? 'Success' : 'Failed');
+    
+    // Also try to get from cookie again
+    return getCookie('csrftoken') || data.csrfToken || null;
+}
+
 export async function ensureCSRFToken(BASE_URL) {
     try {
         // First, try to get the current CSRF token from cookie
-        let csrftoken = getCookie('csrftoken');
+        const csrftoken = getCookie('csrftoken') || cachedCSRFToken;
+        if (csrftoken) {
+            return csrftoken;
+        }
         
-        if (!csrftoken) {
-            // If no token exists, make a GET request to get one
-            const response = await fetch(`${BASE_URL}/get-csrf/`, {
-                method: 'GET',
-                credentials: 'include',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
+        if (!pendingCSRFRequest) {
+            pendingCSRFRequest = requestCSRFToken(BASE_URL).finally(() => {
+                pendingCSRFRequest = null;
             });
-            
-            if (response.ok) {
-                const data = await response.json();
-                csrftoken = data.csrfToken;
-                console.log('New CSRF token obtained:', csrftoken ? 'Success' : 'Failed');
-                
-                // Also try to get from cookie again
-                const cookieToken = getCookie('csrftoken');
-                if (cookieToken) {
-                    csrftoken = cookieToken;
-                }
-            } else {
-                console.error('Failed to get CSRF token, status:', response.status);
-            }
         }
-        
-        return csrftoken;
+        cachedCSRFToken = await pendingCSRFRequest;
+        return cachedCSRFToken;
     } catch (error) {
         console.error('Error ensuring CSRF token:', error);
         return null;
     }
-}
\ No newline at end of file
+}
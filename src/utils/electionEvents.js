@@ -0,0 +1,93 @@
+// src/utils/electionEvents.js
+// Push channel for election updates. Prefers Server-Sent Events, falls back
+// to long-polling, and reports live=false when neither is available so the
+// caller can keep its own interval polling.
+
+const EVENT_TYPES = ['election_start', 'election_end', 'settings_changed', 'audit_log', 'results'];
+
+export function subscribeToElectionEvents(BASE_URL, handlers, onLiveChange = () => {}) {
+    let closed = false;
+    let source = null;
+    let pollController = null;
+
+    const dispatch = (type, data) => {
+        if (handlers[type]) {
+            handlers[type](data);
+        }
+    };
+
+    const longPoll = async () => {
+        let since = null;
+        let failures = 0;
+
+        while (!closed) {
+            try {
+                pollController = new AbortController();
+                const query = since === null ? '' : `?since=${since}&timeout=25`;
+                const response = await fetch(`${BASE_URL}/api/events/poll/${query}`, {
+                    credentials: 'include',
+                    signal: pollController.signal,
+                });
+
+                if (response.status === 501 || response.status === 401) {
+                    // No ASGI server behind the API (or not logged in):
+                    // interval polling it is, without retrying
+                    onLiveChange(false);
+                    return;
+                }
+                if (!response.ok) {
+                    throw new Error(`Event poll failed: ${response.status}`);
+                }
+
+                const data = await response.json();
+                if (since === null) {
+                    onLiveChange(true);
+                }
+                since = data.last_id;
+                failures = 0;
+                data.events.forEach(event => dispatch(event.type, event.data));
+            } catch (error) {
+                if (closed) return;
+                failures += 1;
+                if (failures >= 3) {
+                    console.error('Election event channel unavailable, falling back to polling:', error);
+                    onLiveChange(false);
+                    return;
+                }
+                await new Promise(resolve => setTimeout(resolve, 5000));
+            }
+        }
+    };
+
+    if (typeof window !== 'undefined' && window.EventSource) {
+        let opened = false;
+        source = new EventSource(`${BASE_URL}/api/events/`, { withCredentials: true });
+
+        source.onopen = () => {
+            opened = true;
+            onLiveChange(true);
+        };
+        source.onerror = () => {
+            if (!opened || source.readyState === EventSource.CLOSED) {
+                // The stream never came up (or was refused); try long-polling
+                source.close();
+                source = null;
+                if (opened) onLiveChange(false);
+                longPoll();
+            }
+        };
+        EVENT_TYPES.forEach(type => {
+            source.addEventListener(type, (event) => {
+                dispatch(type, JSON.parse(event.data || '{}'));
+            });
+        });
+    } else {
+        longPoll();
+    }
+
+    return () => {
+        closed = true;
+        if (source) source.close();
+        if (pollController) pollController.abort();
+    };
+}